@@ -47,6 +47,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -81,11 +82,48 @@ WSGI_APPLICATION = 'app.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.db.backends.postgresql',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
-        'PASSWORD': os.environ.get('DB_PASS')
+        'PASSWORD': os.environ.get('DB_PASS'),
+        # per process connection pool, see core.db.pool.ConnectionPool
+        'POOL': {
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            'MAX_LIFETIME': int(os.environ.get('DB_POOL_MAX_LIFETIME', 1800)),
+            'CHECK_AFTER': int(os.environ.get('DB_POOL_CHECK_AFTER', 30)),
+        },
+    }
+}
+
+# read replicas, as comma separated hosts sharing the default credentials
+for index, host in enumerate(
+        filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), 1):
+    DATABASES[f'replica{index}'] = dict(
+        DATABASES['default'], HOST=host, TEST={'MIRROR': 'default'}
+    )
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['core.db.routers.ReplicaRouter']
+# seconds a client reads from the primary after writing, to outlast lag
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 5))
+# seconds a replica health check result is reused
+REPLICA_HEALTH_TTL = int(os.environ.get('REPLICA_HEALTH_TTL', 10))
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.0/topics/cache/
+# the default local memory cache is per process; set a shared backend
+# (e.g. memcached) when running more than one worker
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
     }
 }
 
@@ -93,6 +131,33 @@ DATABASES = {
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
 
+# the first hasher is used for new passwords, older hashes are upgraded
+# on the next successful login
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
+AUTHENTICATION_BACKENDS = ['user.backends.PooledModelBackend']
+
+# threads checking passwords on login, how many more logins may queue for
+# them and how many seconds a login waits for a place before giving up
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 4))
+PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 64))
+PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 5))
+
+# login attempts allowed per client ip and failed ones per email, checked
+# before any password is hashed; set SHARED_CACHE to a CACHES alias to
+# enforce them across processes
+LOGIN_THROTTLE = {
+    'IP_RATE': os.environ.get('LOGIN_THROTTLE_IP_RATE', '20/min'),
+    'EMAIL_RATE': os.environ.get('LOGIN_THROTTLE_EMAIL_RATE', '5/min'),
+    'MAX_KEYS': int(os.environ.get('LOGIN_THROTTLE_MAX_KEYS', 10000)),
+    'SHARED_CACHE': os.environ.get('LOGIN_THROTTLE_SHARED_CACHE'),
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -131,5 +196,66 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = '/vol/web/media/'
 STATIC_ROOT = '/vol/web/static'
+# how media is sent: '' from Django, 'x-accel-redirect' (nginx) with files
+# under MEDIA_ACCEL_PREFIX, or 'x-sendfile' (apache, lighttpd)
+MEDIA_ACCEL = os.environ.get('MEDIA_ACCEL', '')
+MEDIA_ACCEL_PREFIX = os.environ.get('MEDIA_ACCEL_PREFIX', '/protected-media/')
+MEDIA_CACHE_MAX_AGE = int(os.environ.get('MEDIA_CACHE_MAX_AGE', 31536000))
+# uploads are named by content hash so identical images share one file
+DEFAULT_FILE_STORAGE = 'core.storage.ContentAddressedStorage'
+# large uploads are hashed while they are written to a temporary file
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'core.uploadhandler.HashingFileUploadHandler',
+]
 
 AUTH_USER_MODEL = 'core.User'
+
+# the browsable API renders HTML for every request that asks for it, so it
+# is only on where explicitly enabled, e.g. in docker-compose for development
+API_BROWSABLE = os.environ.get('API_BROWSABLE', '0') == '1'
+
+# orjson backed JSON everywhere, the browsable API only when enabled
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+    ] + (['rest_framework.renderers.BrowsableAPIRenderer']
+         if API_BROWSABLE else []),
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    # proxies in front of the app whose X-Forwarded-For may be trusted,
+    # 0 keys clients on REMOTE_ADDR so the header cannot be spoofed
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
+}
+
+# default and maximum ?page_size= for paginated recipe API lists
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', 100))
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', 500))
+# seconds a cached tag or ingredient list response is kept
+API_LIST_CACHE_TIMEOUT = int(os.environ.get('API_LIST_CACHE_TIMEOUT', 300))
+# users whose tag and ingredient autocomplete indexes a process keeps
+AUTOCOMPLETE_USERS = int(os.environ.get('AUTOCOMPLETE_USERS', 1000))
+# seconds before an autocomplete index is rebuilt even if unchanged
+AUTOCOMPLETE_TIMEOUT = int(os.environ.get('AUTOCOMPLETE_TIMEOUT', 30))
+# processes resizing uploaded recipe images, 0 resizes in the request
+RECIPE_IMAGE_WORKERS = int(os.environ.get('RECIPE_IMAGE_WORKERS', 2))
+# largest recipe image accepted, in bytes and in pixels
+RECIPE_IMAGE_MAX_BYTES = int(
+    os.environ.get('RECIPE_IMAGE_MAX_BYTES', 10 * 1024 * 1024)
+)
+RECIPE_IMAGE_MAX_PIXELS = int(
+    os.environ.get('RECIPE_IMAGE_MAX_PIXELS', 40 * 1000 * 1000)
+)
+# maximum number of items accepted by the bulk endpoints
+API_MAX_BULK_SIZE = int(os.environ.get('API_MAX_BULK_SIZE', 1000))
+
+# token -> user lookups cached per process; SHARED_CACHE names an entry of
+# CACHES used as a second tier shared between processes
+TOKEN_AUTH_CACHE = {
+    'MAX_SIZE': int(os.environ.get('TOKEN_AUTH_CACHE_SIZE', 10000)),
+    'TTL': int(os.environ.get('TOKEN_AUTH_CACHE_TTL', 30)),
+    'SHARED_CACHE': os.environ.get('TOKEN_AUTH_SHARED_CACHE'),
+}
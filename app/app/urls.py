@@ -14,12 +14,17 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
-from django.conf.urls.static import static
+from django.urls import path, re_path, include
 from django.conf import settings
 
+from recipe.views import MediaView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/user/', include('user.urls')),
     path('api/recipe/', include('recipe.urls')),
-] + static(settings.MEDIA_ROOT, document_root=settings.MEDIA_ROOT)
+    re_path(
+        r'^%s(?P<path>.+)$' % settings.MEDIA_URL.lstrip('/'),
+        MediaView.as_view(), name='media'
+    ),
+]
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        """connect the signal handlers"""
+        from core import signals  # noqa: F401
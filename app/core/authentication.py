@@ -0,0 +1,118 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+
+
+class TokenCache:
+    """LRU cache of token key to token, with an optional shared tier
+
+    Entries are kept pickled so every request gets its own copy of the
+    token and user instead of sharing one mutable object across threads.
+    """
+    key_prefix = 'token-auth:'
+
+    def __init__(self, max_size=10000, ttl=30, shared_cache=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.shared_cache = shared_cache
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.shared_hits = self.misses = 0
+
+    @classmethod
+    def from_settings(cls):
+        """build the cache from the TOKEN_AUTH_CACHE setting"""
+        options = getattr(settings, 'TOKEN_AUTH_CACHE', {})
+        return cls(
+            max_size=options.get('MAX_SIZE', 10000),
+            ttl=options.get('TTL', 30),
+            shared_cache=options.get('SHARED_CACHE'),
+        )
+
+    def _shared(self):
+        """return the shared cache backend, if one is configured"""
+        if self.shared_cache:
+            return caches[self.shared_cache]
+        return None
+
+    def get(self, key):
+        """return the cached token for key, or None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return pickle.loads(entry[1])
+            if entry:
+                del self._entries[key]
+        shared = self._shared()
+        data = shared.get(self.key_prefix + key) if shared else None
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.shared_hits += 1
+            self._store(key, data, now)
+        return pickle.loads(data)
+
+    def set(self, key, token):
+        """cache token under key in every tier"""
+        data = pickle.dumps(token, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._store(key, data, time.monotonic())
+        shared = self._shared()
+        if shared:
+            shared.set(self.key_prefix + key, data, self.ttl)
+
+    def _store(self, key, data, now):
+        """store data in the local tier, evicting the oldest entries"""
+        self._entries[key] = (now + self.ttl, data)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        """drop keys from every tier"""
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+        shared = self._shared()
+        if shared and keys:
+            shared.delete_many([self.key_prefix + key for key in keys])
+
+    def clear(self):
+        """drop every local entry and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.shared_hits = self.misses = 0
+
+    def stats(self):
+        """return the hit and miss counters"""
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+            }
+
+
+token_cache = TokenCache.from_settings()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """token authentication that caches the token to user lookup"""
+
+    def authenticate_credentials(self, key):
+        """return the user and token for key, from the cache if possible"""
+        token = token_cache.get(key)
+        if token is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, token)
+        return (token.user, token)
@@ -0,0 +1,98 @@
+import threading
+
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.base import Database
+from django.db.backends.postgresql.creation import DatabaseCreation as \
+    BaseDatabaseCreation
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+from core.db.pool import ConnectionPool
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def check_connection(conn):
+    """return whether conn still answers queries"""
+    if conn.closed:
+        return False
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        if conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+            conn.rollback()
+    except Database.Error:
+        return False
+    return True
+
+
+def close_pools():
+    """close the idle connections of every pool in this process"""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.closeall()
+
+
+def pool_stats():
+    """return the metrics of every pool in this process"""
+    with _pools_lock:
+        return [pool.stats() for pool in _pools.values()]
+
+
+class DatabaseCreation(BaseDatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # pooled connections would keep the test database in use
+        close_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """postgresql backend reusing connections from a per process pool
+
+    Configured with the POOL dict of the database settings, see
+    ConnectionPool for the meaning of each option.
+    """
+    creation_class = DatabaseCreation
+
+    def get_pool(self, conn_params):
+        """return the pool of connections made with conn_params"""
+        key = tuple(sorted((k, repr(v)) for k, v in conn_params.items()))
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                options = self.settings_dict.get('POOL', {})
+                pool = _pools[key] = ConnectionPool(
+                    connect=lambda: super(DatabaseWrapper, self)
+                    .get_new_connection(conn_params),
+                    close=lambda conn: conn.close(),
+                    check=check_connection,
+                    max_size=options.get('MAX_SIZE', 10),
+                    timeout=options.get('TIMEOUT', 10),
+                    max_lifetime=options.get('MAX_LIFETIME', 1800),
+                    check_after=options.get('CHECK_AFTER', 30),
+                )
+            return pool
+
+    def get_new_connection(self, conn_params):
+        self.pool = self.get_pool(conn_params)
+        connection = self.pool.getconn()
+        # set by the parent class only on the wrapper that opened it
+        self.isolation_level = connection.isolation_level
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        # closed inside atomic the session may still hold its locks and
+        # savepoints, never hand it to another thread
+        discard = self.errors_occurred or self.in_atomic_block or \
+            bool(self.connection.closed)
+        if not discard and self.connection.get_transaction_status() != \
+                TRANSACTION_STATUS_IDLE:
+            try:
+                self.connection.rollback()
+            except Database.Error:
+                discard = True
+        self.pool.putconn(self.connection, discard=discard)
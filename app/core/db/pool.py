@@ -0,0 +1,147 @@
+import os
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeout(Exception):
+    """no connection became available within the pool timeout"""
+
+
+class ConnectionPool:
+    """bounded pool of database connections for one process
+
+    Connections are handed out most recently used first. Each one is
+    checked when it has been idle for longer than check_after seconds,
+    and replaced once older than max_lifetime seconds.
+    """
+
+    def __init__(self, connect, close, check, max_size=10, timeout=10,
+                 max_lifetime=1800, check_after=30):
+        self.connect = connect
+        self.close = close
+        self.check = check
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.check_after = check_after
+        self._cond = threading.Condition()
+        self._reset()
+
+    def _reset(self):
+        """forget every connection, as after a fork"""
+        self._pid = os.getpid()
+        self._idle = deque()
+        self._created = {}
+        self._size = 0
+        self.checkouts = self.waits = self.timeouts = 0
+        self.created = self.discarded = 0
+        self.wait_time = self.max_wait = 0.0
+
+    def _expired(self, conn, now):
+        return now - self._created[id(conn)] > self.max_lifetime
+
+    def _discard(self, conn):
+        """close conn and free its place in the pool, holding the lock"""
+        self._created.pop(id(conn), None)
+        self._size -= 1
+        self.discarded += 1
+        self._cond.notify()
+        try:
+            self.close(conn)
+        except Exception:
+            pass
+
+    def getconn(self):
+        """return an idle connection, or a new one while under max_size"""
+        start = time.monotonic()
+        waited = False
+        with self._cond:
+            if self._pid != os.getpid():
+                # connections opened by the parent process are not ours
+                self._reset()
+            while True:
+                now = time.monotonic()
+                if self._idle:
+                    conn, returned = self._idle.pop()
+                    if self._expired(conn, now):
+                        self._discard(conn)
+                        continue
+                    if now - returned > self.check_after:
+                        self._cond.release()
+                        try:
+                            healthy = self.check(conn)
+                        finally:
+                            self._cond.acquire()
+                        if not healthy:
+                            self._discard(conn)
+                            continue
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    conn = None
+                    break
+                remaining = start + self.timeout - now
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(
+                        f'No connection available within {self.timeout}s.'
+                    )
+                waited = True
+                self._cond.wait(remaining)
+
+            wait = time.monotonic() - start
+            self.checkouts += 1
+            if waited:
+                self.waits += 1
+                self.wait_time += wait
+                self.max_wait = max(self.max_wait, wait)
+            if conn is not None:
+                return conn
+
+        try:
+            conn = self.connect()
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._created[id(conn)] = time.monotonic()
+            self.created += 1
+        return conn
+
+    def putconn(self, conn, discard=False):
+        """return conn to the pool, closing it if broken or too old"""
+        with self._cond:
+            if id(conn) not in self._created:
+                # opened before a fork or after a reset
+                self.close(conn)
+                return
+            if discard or self._expired(conn, time.monotonic()):
+                self._discard(conn)
+                return
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def closeall(self):
+        """close every idle connection"""
+        with self._cond:
+            while self._idle:
+                self._discard(self._idle.popleft()[0])
+
+    def stats(self):
+        """return the size of the pool and its checkout and wait metrics"""
+        with self._cond:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'wait_time': self.wait_time,
+                'max_wait': self.max_wait,
+                'timeouts': self.timeouts,
+                'created': self.created,
+                'discarded': self.discarded,
+            }
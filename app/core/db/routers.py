@@ -0,0 +1,87 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+
+_state = threading.local()
+_health = {}
+_health_lock = threading.Lock()
+
+
+def replica_reads_enabled():
+    """return whether reads on this thread may go to a replica"""
+    return getattr(_state, 'replica_reads', False)
+
+
+def set_replica_reads(enabled):
+    """allow or forbid replica reads on this thread, return the old value"""
+    previous = replica_reads_enabled()
+    _state.replica_reads = enabled
+    return previous
+
+
+@contextmanager
+def primary_reads():
+    """read from the default database inside the block
+
+    For reads whose result is cached under the current cache version,
+    a lagging replica would otherwise store stale rows under it.
+    """
+    previous = set_replica_reads(False)
+    try:
+        yield
+    finally:
+        set_replica_reads(previous)
+
+
+def is_healthy(alias):
+    """return whether alias answers queries, cached for a few seconds"""
+    now = time.monotonic()
+    with _health_lock:
+        expires, healthy = _health.get(alias, (0, False))
+    if expires > now:
+        return healthy
+    try:
+        connection = connections[alias]
+        connection.ensure_connection()
+        healthy = connection.is_usable()
+    except DatabaseError:
+        healthy = False
+    with _health_lock:
+        _health[alias] = (now + settings.REPLICA_HEALTH_TTL, healthy)
+    return healthy
+
+
+def choose_replica():
+    """return a healthy replica alias, None when all of them are down"""
+    healthy = [alias for alias in settings.DATABASE_REPLICAS
+               if is_healthy(alias)]
+    return random.choice(healthy) if healthy else None
+
+
+class ReplicaRouter:
+    """send reads to a healthy replica while the request allows it
+
+    Writes, reads inside a transaction and reads outside of requests
+    marked by ReplicaRoutingMiddleware all use the default database.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not replica_reads_enabled() or \
+                connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return choose_replica()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same rows as the default database
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
@@ -0,0 +1,118 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# run in a fresh interpreter so every import is cold
+SCRIPT = '''
+import io, json, sys, time
+start = time.perf_counter()
+import {module} as wsgi
+ready = time.perf_counter()
+environ = {{
+    'REQUEST_METHOD': 'GET', 'PATH_INFO': {path!r}, 'QUERY_STRING': '',
+    'SERVER_NAME': {host!r}, 'SERVER_PORT': '80', 'HTTP_HOST': {host!r},
+    'SERVER_PROTOCOL': 'HTTP/1.1', 'wsgi.version': (1, 0),
+    'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(),
+    'wsgi.errors': sys.stderr, 'wsgi.multithread': False,
+    'wsgi.multiprocess': True, 'wsgi.run_once': False,
+}}
+status = []
+response = wsgi.application(environ, lambda s, h, e=None: status.append(s))
+b''.join(response)
+response.close()
+done = time.perf_counter()
+print(json.dumps({{
+    'import': ready - start, 'request': done - ready, 'status': status[0],
+}}))
+'''
+
+
+def parse_importtime(stderr):
+    """return (self us, cumulative us, module) for each -X importtime line"""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        imports.append(
+            (int(fields[0]), int(fields[1]), fields[2].strip())
+        )
+    return imports
+
+
+class Command(BaseCommand):
+    """Django command to measure the cold start of a worker"""
+    help = 'Report import time per module and time to the first request.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', default='/api/recipe/',
+            help='Path of the first request (default: /api/recipe/).',
+        )
+        parser.add_argument(
+            '--runs', type=int, default=3,
+            help='Cold starts to measure, the median is reported '
+                 '(default: 3).',
+        )
+        parser.add_argument(
+            '--limit', type=int, default=25,
+            help='Number of slowest modules to list (default: 25).',
+        )
+
+    def run_once(self, path):
+        """start a fresh interpreter, return its timings and imports"""
+        module = settings.WSGI_APPLICATION.rsplit('.', 1)[0]
+        host = settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS \
+            else 'localhost'
+        env = dict(os.environ)
+        env.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c',
+             SCRIPT.format(module=module, path=path, host=host)],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        # a child killed by a signal may print nothing at all
+        errors = result.stderr.strip().splitlines()
+        if result.returncode:
+            raise CommandError(
+                errors[-1] if errors else f'exit {result.returncode}'
+            )
+        output = result.stdout.strip().splitlines()
+        if not output:
+            raise CommandError('no timings printed')
+        timings = json.loads(output[-1])
+        return timings, parse_importtime(result.stderr)
+
+    def handle(self, *args, **options):
+        """measure cold starts and print the slowest imports"""
+        runs = [self.run_once(options['path'])
+                for _ in range(max(options['runs'], 1))]
+        imports = runs[-1][1]
+        slowest = sorted(imports, key=lambda i: i[1], reverse=True)
+        self.stdout.write(f"{'self ms':>9} {'cumul ms':>9}  module")
+        for self_us, cumulative_us, module in slowest[:options['limit']]:
+            self.stdout.write(
+                f'{self_us / 1000:9.1f} {cumulative_us / 1000:9.1f}  {module}'
+            )
+
+        import_s = statistics.median(t['import'] for t, _ in runs)
+        request_s = statistics.median(t['request'] for t, _ in runs)
+        self.stdout.write(
+            f'{len(imports)} modules, '
+            f'{sum(i[0] for i in imports) / 1000:.1f}ms importing'
+        )
+        self.stdout.write(f'wsgi application ready: {import_s * 1000:.1f}ms')
+        self.stdout.write(
+            f"first request ({runs[-1][0]['status']}): "
+            f'{request_s * 1000:.1f}ms'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'time to first request: {(import_s + request_s) * 1000:.1f}ms'
+        ))
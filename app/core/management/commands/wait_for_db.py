@@ -1,20 +1,90 @@
+import random
 import time
+from concurrent.futures import ThreadPoolExecutor
 from django.db import connections
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+
+
+def probe(alias):
+    """open a connection to alias and run a trivial query on it"""
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    finally:
+        connection.close()
 
 
 class Command(BaseCommand):
     """Django command to pause execution before DB is available"""
+    help = 'Wait until the databases accept queries.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', action='append', dest='databases',
+            help='Database alias to wait for, may be repeated '
+                 '(default: default).',
+        )
+        parser.add_argument(
+            '--timeout', type=float, default=60,
+            help='Seconds to wait in total before failing (default: 60).',
+        )
+        parser.add_argument(
+            '--initial-delay', type=float, default=0.05,
+            help='Seconds before the first retry, doubled on every retry '
+                 '(default: 0.05).',
+        )
+        parser.add_argument(
+            '--max-delay', type=float, default=2,
+            help='Longest pause between two retries (default: 2).',
+        )
+
+    def wait_for(self, alias, deadline, initial_delay, max_delay):
+        """probe alias until it answers, return (seconds, attempts)"""
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                probe(alias)
+                return time.monotonic() - start, attempt
+            except OperationalError as exc:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CommandError(
+                        f"Database '{alias}' unavailable after "
+                        f'{time.monotonic() - start:.2f}s: {exc}'
+                    )
+                delay = min(max_delay, initial_delay * 2 ** (attempt - 1))
+                # jitter so restarting containers do not retry in lockstep
+                delay = random.uniform(delay / 2, delay)
+                self.stdout.write(
+                    f"Database '{alias}' unavailable, "
+                    f'retrying in {delay * 1000:.0f}ms ...'
+                )
+                time.sleep(min(delay, remaining))
 
     def handle(self, *args, **options):
-        """"""
+        """wait for every database in parallel and report time to ready"""
         self.stdout.write('Waiting for DB')
-        db_conn = None
-        while not db_conn:
-            try:
-                db_conn = connections['default']
-            except OperationalError:
-                self.stdout.write('DB unavailable, waiting 1 sec n retry ...')
-                time.sleep(1)
-        self.stdout.write(self.style.SUCCESS('DB up and available'))
+        aliases = options['databases'] or ['default']
+        deadline = time.monotonic() + options['timeout']
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=len(aliases)) as executor:
+            futures = {
+                alias: executor.submit(
+                    self.wait_for, alias, deadline,
+                    options['initial_delay'], options['max_delay']
+                )
+                for alias in aliases
+            }
+            for alias, future in futures.items():
+                seconds, attempts = future.result()
+                self.stdout.write(
+                    f"Database '{alias}' ready after {seconds:.3f}s "
+                    f'({attempts} attempts)'
+                )
+        self.stdout.write(self.style.SUCCESS(
+            f'DB up and available in {time.monotonic() - start:.3f}s'
+        ))
@@ -0,0 +1,138 @@
+import mimetypes
+import os
+import re
+from stat import S_ISREG
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, \
+    StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, \
+    patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from django.utils.encoding import escape_uri_path
+
+
+READ_SIZE = 64 * 1024
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header, size):
+    """return (start, end) of a single byte range, None for the whole file
+
+    Multiple ranges are not supported and are answered with the whole file.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        start, end = max(size - int(last), 0), size - 1
+        if not int(last):
+            raise RangeNotSatisfiable
+    if start > end:
+        raise RangeNotSatisfiable
+    return start, end
+
+
+def read_range(path, start, length):
+    """yield length bytes of the file at path from start"""
+    with open(path, 'rb') as source:
+        source.seek(start)
+        while length > 0:
+            data = source.read(min(length, READ_SIZE))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+
+
+def accel_response(name, path, content_type):
+    """return an empty response telling the web server to send the file"""
+    response = HttpResponse(content_type=content_type)
+    if settings.MEDIA_ACCEL == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = escape_uri_path(
+            settings.MEDIA_ACCEL_PREFIX + name
+        )
+    else:
+        response['X-Sendfile'] = path
+    return response
+
+
+def file_response(request, path, size, content_type, etag):
+    """return the file at path, or the byte range requested of it"""
+    byte_range = None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if 'HTTP_RANGE' in request.META and if_range in (None, etag):
+        try:
+            byte_range = parse_range(request.META['HTTP_RANGE'], size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range is None:
+        # servers with wsgi.file_wrapper send this with sendfile
+        response = FileResponse(
+            open(path, 'rb'), content_type=content_type
+        )
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            read_range(path, start, end - start + 1),
+            status=206, content_type=content_type
+        )
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def serve_media(request, name):
+    """serve the file stored at name under MEDIA_ROOT
+
+    The bytes are handed to the web server with X-Accel-Redirect or
+    X-Sendfile when MEDIA_ACCEL is set, otherwise they are sent from
+    Python with support for single byte ranges.
+    """
+    try:
+        path = safe_join(settings.MEDIA_ROOT, name)
+    except SuspiciousFileOperation:
+        raise Http404
+    try:
+        stat = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404
+    if not S_ISREG(stat.st_mode):
+        raise Http404
+
+    etag = quote_etag(f'{stat.st_mtime_ns:x}-{stat.st_size:x}')
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(stat.st_mtime)
+    )
+    if response is None:
+        content_type = mimetypes.guess_type(path)[0] or \
+            'application/octet-stream'
+        if settings.MEDIA_ACCEL:
+            response = accel_response(name, path, content_type)
+        else:
+            response = file_response(
+                request, path, stat.st_size, content_type, etag
+            )
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    # stored files are named by content hash and never change
+    patch_cache_control(
+        response, private=True, max_age=settings.MEDIA_CACHE_MAX_AGE,
+        immutable=True
+    )
+    patch_vary_headers(response, ('Authorization',))
+    return response
@@ -0,0 +1,49 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.db.routers import set_replica_reads
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def pin_keys(request):
+    """return the cache keys pinning the client of request to the primary
+
+    Token clients are pinned by their Authorization header, anonymous
+    ones, such as a login creating a token, by their address.
+    """
+    keys = [f"db-pin:ip:{request.META.get('REMOTE_ADDR')}"]
+    authorization = request.META.get('HTTP_AUTHORIZATION')
+    if authorization:
+        digest = hashlib.sha256(authorization.encode()).hexdigest()
+        keys.insert(0, f'db-pin:auth:{digest}')
+    return keys
+
+
+class ReplicaRoutingMiddleware:
+    """read from replicas on safe requests unless the client just wrote
+
+    After a write the client reads from the primary for
+    REPLICA_PIN_SECONDS so it sees its own changes despite replica lag.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        keys = pin_keys(request)
+        safe = request.method in SAFE_METHODS
+        previous = set_replica_reads(safe and not cache.get_many(keys))
+        try:
+            response = self.get_response(request)
+        finally:
+            set_replica_reads(previous)
+        if not safe:
+            cache.set(keys[0], True, settings.REPLICA_PIN_SECONDS)
+        return response
@@ -0,0 +1,50 @@
+# Generated by Django 3.0.7 on 2026-10-18 16:39
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def log_existing_objects(apps, schema_editor):
+    """log every existing object so a first sync returns all of them"""
+    ChangeLog = apps.get_model('core', 'ChangeLog')
+    for name in ('tag', 'ingredient', 'recipe'):
+        model = apps.get_model('core', name)
+        rows = model.objects.order_by('id').values_list('id', 'user_id')
+        batch = []
+        for object_id, user_id in rows.iterator():
+            batch.append(ChangeLog(
+                user_id=user_id,
+                model=name,
+                object_id=object_id,
+                action='upsert'
+            ))
+            if len(batch) == 1000:
+                ChangeLog.objects.bulk_create(batch)
+                batch = []
+        ChangeLog.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=20)),
+                ('object_id', models.IntegerField()),
+                ('action', models.CharField(choices=[('upsert', 'upsert'), ('delete', 'delete')], max_length=10)),
+                ('user', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='changelog',
+            index=models.Index(fields=['user', 'id'], name='core_change_user_id_ee010b_idx'),
+        ),
+        migrations.RunPython(log_existing_objects, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.0.7 on 2026-10-18 16:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_changelog'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['user', 'name'], name='core_ingred_user_id_b96ee8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['user', 'id'], name='core_recipe_user_id_bf8313_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', 'name'], name='core_tag_user_id_74e398_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+from django.db import migrations
+
+
+BACKFILL_SQL = """
+UPDATE core_recipe SET search_vector =
+    setweight(to_tsvector('english', title), 'A') ||
+    setweight(to_tsvector('english', coalesce((
+        SELECT string_agg(i.name, ' ')
+        FROM core_ingredient i
+        JOIN core_recipe_ingredients ri ON ri.ingredient_id = i.id
+        WHERE ri.recipe_id = core_recipe.id
+    ), '')), 'B') ||
+    setweight(to_tsvector('english', coalesce((
+        SELECT string_agg(t.name, ' ')
+        FROM core_tag t
+        JOIN core_recipe_tags rt ON rt.tag_id = t.id
+        WHERE rt.recipe_id = core_recipe.id
+    ), '')), 'C')
+"""
+
+
+def create_search_index(apps, schema_editor):
+    """backfill and index the search vector, on Postgres only"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(BACKFILL_SQL)
+    schema_editor.execute(
+        'CREATE INDEX core_recipe_search_vector_gin '
+        'ON core_recipe USING gin (search_vector)'
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    """drop the search vector index"""
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX core_recipe_search_vector_gin')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
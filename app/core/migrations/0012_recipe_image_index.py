@@ -0,0 +1,19 @@
+# Generated by Django 3.0.7 on 2026-10-18 16:50
+
+import core.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_recipe_search_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(db_index=True, null=True, upload_to=core.models.recipe_image_file_path),
+        ),
+    ]
@@ -4,6 +4,7 @@ from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
                                         PermissionsMixin
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 
 
 def recipe_image_file_path(instance, filename):
@@ -51,6 +52,10 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['user', 'name'])]
 
     def __str__(self):
         """string representation"""
@@ -64,6 +69,10 @@ class Ingredient(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['user', 'name'])]
 
     def __str__(self):
         """str representation"""
@@ -82,8 +91,42 @@ class Recipe(models.Model):
     link = models.CharField(max_length=255, blank=True)
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
-    image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image = models.ImageField(
+        null=True, upload_to=recipe_image_file_path, db_index=True
+    )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # title, ingredient and tag names; kept up to date by core.search
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [models.Index(fields=['user', 'id'])]
 
     def __str__(self):
         """string representation"""
         return self.title
+
+
+class ChangeLog(models.Model):
+    """change to a recipe, tag or ingredient, read by the sync endpoint"""
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+    ACTION_CHOICES = ((UPSERT, 'upsert'), (DELETE, 'delete'))
+
+    # no database constraint, rows may be logged while the user is deleted
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+        related_name='+'
+    )
+    model = models.CharField(max_length=20)
+    object_id = models.IntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+
+    class Meta:
+        indexes = [models.Index(fields=['user', 'id'])]
+
+    def __str__(self):
+        """string representation"""
+        return f'{self.action} {self.model} {self.object_id}'
@@ -0,0 +1,22 @@
+from django.conf import settings
+from rest_framework import parsers
+from rest_framework.exceptions import ParseError
+
+from core.renderers import orjson
+
+
+class FastJSONParser(parsers.JSONParser):
+    """JSON parser decoding with orjson when it is installed"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            data = stream.read()
+            if encoding.lower().replace('-', '') != 'utf8':
+                data = data.decode(encoding)
+            return orjson.loads(data)
+        except (ValueError, UnicodeDecodeError) as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
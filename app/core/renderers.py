@@ -0,0 +1,46 @@
+import json
+
+from rest_framework import renderers
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+_default = JSONEncoder().default
+
+
+def dumps(data, indent=None):
+    """encode data to compact UTF-8 JSON bytes like the JSON renderer
+
+    Uses orjson when installed. Types it does not handle natively, such as
+    Decimal, lazy strings and datetimes, go through DRF's JSONEncoder so
+    the output does not depend on which encoder is available.
+    """
+    if orjson is not None and indent in (None, 2):
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=_default, option=option)
+    return json.dumps(
+        data, cls=JSONEncoder, indent=indent, ensure_ascii=False,
+        separators=(',', ': ') if indent else (',', ':')
+    ).encode()
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """JSON renderer encoding with orjson when it is installed"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        # orjson only writes UTF-8, strict JSON and two space indents
+        if orjson is None or data is None or self.ensure_ascii or \
+                not self.strict or indent not in (None, 2):
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = dumps(data, indent)
+        # escape the separators JavaScript treats as line breaks, like
+        # JSONRenderer does
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028') \
+            .replace(b'\xe2\x80\xa9', b'\\u2029')
@@ -0,0 +1,72 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import Case, Exists, F, FloatField, OuterRef, Q, \
+    Value, When
+from django.db.models.functions import Cast
+
+from core.models import Recipe
+
+
+SEARCH_CONFIG = 'english'
+
+# title ranks above ingredient names, which rank above tag names
+UPDATE_VECTOR_SQL = """
+UPDATE core_recipe SET search_vector =
+    setweight(to_tsvector(%(config)s, title), 'A') ||
+    setweight(to_tsvector(%(config)s, coalesce((
+        SELECT string_agg(i.name, ' ')
+        FROM core_ingredient i
+        JOIN core_recipe_ingredients ri ON ri.ingredient_id = i.id
+        WHERE ri.recipe_id = core_recipe.id
+    ), '')), 'B') ||
+    setweight(to_tsvector(%(config)s, coalesce((
+        SELECT string_agg(t.name, ' ')
+        FROM core_tag t
+        JOIN core_recipe_tags rt ON rt.tag_id = t.id
+        WHERE rt.recipe_id = core_recipe.id
+    ), '')), 'C')
+WHERE id = ANY(%(ids)s)
+"""
+
+
+def is_postgresql():
+    """return whether full text search is available"""
+    return connection.vendor == 'postgresql'
+
+
+def update_search_vectors(recipe_ids):
+    """recompute the search vector of the given recipes"""
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids or not is_postgresql():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            UPDATE_VECTOR_SQL, {'config': SEARCH_CONFIG, 'ids': recipe_ids}
+        )
+
+
+def search_recipes(queryset, terms):
+    """filter queryset to recipes matching terms, annotated with a rank
+
+    Postgres matches against the GIN indexed search vector. Other
+    databases fall back to substring matching so tests can run locally.
+    The rank is cast to double precision because ts_rank returns a real,
+    which does not round trip through the float kept in a page cursor.
+    """
+    if is_postgresql():
+        query = SearchQuery(terms, config=SEARCH_CONFIG)
+        return queryset.filter(search_vector=query).annotate(
+            rank=Cast(SearchRank(F('search_vector'), query), FloatField())
+        )
+    matches = Q(title__icontains=terms)
+    for name in ('ingredients', 'tags'):
+        field = Recipe._meta.get_field(name)
+        matches |= Q(Exists(field.remote_field.through.objects.filter(**{
+            field.m2m_column_name(): OuterRef('pk'),
+            f'{field.m2m_reverse_field_name()}__name__icontains': terms,
+        })))
+    return queryset.filter(matches).annotate(rank=Case(
+        When(title__icontains=terms, then=Value(1.0)),
+        default=Value(0.5),
+        output_field=FloatField()
+    ))
@@ -0,0 +1,166 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, \
+    m2m_changed
+from django.dispatch import receiver, Signal
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from core.authentication import token_cache
+from core.models import Tag, Ingredient, Recipe, ChangeLog
+from core.search import is_postgresql, update_search_vectors
+
+
+# sent after bulk_create/bulk_update, which skip post_save and m2m_changed;
+# provides instances and created
+bulk_saved = Signal()
+
+RECIPE_RELATIONS = {Tag: 'tags', Ingredient: 'ingredients'}
+# first key of the advisory locks ordering each user's change log
+CHANGE_LOG_LOCK = 0x5ac
+
+
+@receiver(post_delete, sender=Token)
+def evict_deleted_token(sender, instance, **kwargs):
+    """stop authenticating with a deleted token"""
+    token_cache.delete(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def evict_user_tokens(sender, instance, created, **kwargs):
+    """drop cached copies of a user that was updated or deactivated"""
+    if not created:
+        token_cache.delete(
+            *Token.objects.filter(user=instance).values_list('key', flat=True)
+        )
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def delete_user_changes(sender, instance, **kwargs):
+    """drop the change log of a deleted user"""
+    ChangeLog.objects.filter(user_id=instance.id).delete()
+
+
+def lock_change_log(user_ids):
+    """hold the change logs of user_ids until the transaction ends
+
+    Ids are allocated on insert but become visible on commit. Without
+    the lock a sync could return entry 11 while entry 10 of the same user
+    is still uncommitted, and its watermark would skip entry 10 for good.
+    SQLite never runs two write transactions at once.
+    """
+    if not is_postgresql():
+        return
+    with connection.cursor() as cursor:
+        for user_id in sorted(user_ids):
+            cursor.execute(
+                'SELECT pg_advisory_xact_lock(%s, %s)',
+                [CHANGE_LOG_LOCK, user_id]
+            )
+
+
+def log_changes(model, rows, action=ChangeLog.UPSERT):
+    """log a change for every (object id, user id) pair in rows"""
+    rows = list(rows)
+    if not rows:
+        return
+    with transaction.atomic():
+        lock_change_log({user_id for _, user_id in rows})
+        ChangeLog.objects.bulk_create([
+            ChangeLog(
+                user_id=user_id,
+                model=model._meta.model_name,
+                object_id=object_id,
+                action=action
+            )
+            for object_id, user_id in rows
+        ])
+
+
+def recipes_changed(log=True, **filters):
+    """mark the recipes matching filters as modified now
+
+    Returns the ids of the recipes, whose search vectors are refreshed.
+    """
+    rows = list(Recipe.objects.filter(**filters).values_list('id', 'user_id'))
+    ids = [row[0] for row in rows]
+    Recipe.objects.filter(id__in=ids).update(updated_at=timezone.now())
+    update_search_vectors(ids)
+    if log:
+        log_changes(Recipe, rows)
+    return ids
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_save, sender=Recipe)
+def log_saved(sender, instance, **kwargs):
+    """log a saved recipe, tag or ingredient"""
+    log_changes(sender, [(instance.id, instance.user_id)])
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+def log_deleted(sender, instance, **kwargs):
+    """log a deleted recipe, tag or ingredient"""
+    log_changes(
+        sender, [(instance.id, instance.user_id)], ChangeLog.DELETE
+    )
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def touch_recipes_using(sender, instance, created, **kwargs):
+    """mark recipes showing a renamed tag or ingredient"""
+    if not created:
+        recipes_changed(log=False, **{RECIPE_RELATIONS[sender]: instance})
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def touch_recipes_losing(sender, instance, **kwargs):
+    """mark recipes about to lose a deleted tag or ingredient"""
+    instance._recipe_ids = recipes_changed(
+        **{RECIPE_RELATIONS[sender]: instance}
+    )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def reindex_recipes_lost(sender, instance, **kwargs):
+    """drop a deleted tag or ingredient from recipe search vectors"""
+    update_search_vectors(getattr(instance, '_recipe_ids', []))
+
+
+@receiver(post_save, sender=Recipe)
+def reindex_recipe(sender, instance, update_fields=None, **kwargs):
+    """refresh the search vector of a saved recipe"""
+    if update_fields is None or 'title' in update_fields:
+        update_search_vectors([instance.id])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def touch_recipes_relations(sender, instance, action, reverse, pk_set,
+                            model, **kwargs):
+    """mark recipes whose tags or ingredients were changed"""
+    if not reverse and action in ('post_add', 'post_remove', 'post_clear'):
+        recipes_changed(pk=instance.pk)
+    elif reverse and action in ('post_add', 'post_remove'):
+        recipes_changed(pk__in=pk_set)
+    elif reverse and action == 'pre_clear':
+        recipes_changed(**{RECIPE_RELATIONS[type(instance)]: instance})
+
+
+@receiver(bulk_saved)
+def log_bulk_saved(sender, instances, created, **kwargs):
+    """log bulk saved objects and mark recipes showing renamed ones"""
+    if sender in (Tag, Ingredient, Recipe):
+        log_changes(sender, [(obj.id, obj.user_id) for obj in instances])
+    if sender is Recipe:
+        update_search_vectors([obj.id for obj in instances])
+    if sender in RECIPE_RELATIONS and not created:
+        recipes_changed(
+            log=False, **{f'{RECIPE_RELATIONS[sender]}__in': instances}
+        )
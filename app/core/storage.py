@@ -0,0 +1,162 @@
+import fcntl
+import hashlib
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+
+
+BLOCK_SIZE = 1024 * 1024
+# seconds after which a spare is assumed to belong to a rolled back save
+SPARE_MAX_AGE = 60 * 60
+
+
+class BlockHash:
+    """sha256 over the sha256 digests of every BLOCK_SIZE block of a file
+
+    Unlike a plain sha256 it can be resumed from the digests of the
+    complete blocks, so a file written in several requests never has to
+    be read back in full to be named.
+    """
+
+    def __init__(self, digests=b''):
+        self.digests = digests
+        self._block = hashlib.sha256()
+        self._block_size = 0
+
+    def update(self, data):
+        view = memoryview(data)
+        while view:
+            take = BLOCK_SIZE - self._block_size
+            self._block.update(view[:take])
+            self._block_size += len(view[:take])
+            view = view[take:]
+            if self._block_size == BLOCK_SIZE:
+                self.digests += self._block.digest()
+                self._block = hashlib.sha256()
+                self._block_size = 0
+
+    def hexdigest(self):
+        digests = self.digests
+        if self._block_size:
+            digests += self._block.digest()
+        return hashlib.sha256(digests).hexdigest()
+
+    @classmethod
+    def resume(cls, path, digests=b''):
+        """return the hash of the file at path given its first digests
+
+        Only the bytes after the blocks covered by digests are read.
+        """
+        size = os.path.getsize(path)
+        blocks = min(len(digests) // 32, size // BLOCK_SIZE)
+        hasher = cls(digests[:blocks * 32])
+        with open(path, 'rb') as source:
+            source.seek(blocks * BLOCK_SIZE)
+            for chunk in iter(lambda: source.read(64 * 1024), b''):
+                hasher.update(chunk)
+        return hasher
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """file system storage naming files after the hash of their content
+
+    Saving content that is already stored returns the existing name, so
+    identical uploads share one file. Content may carry a precomputed
+    content_hash, see BlockHash, to skip hashing it again.
+    """
+
+    @contextmanager
+    def lock(self):
+        """serialize saves against deletes of shared files"""
+        os.makedirs(self.location, exist_ok=True)
+        with open(os.path.join(self.location, '.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _save(self, name, content):
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        os.makedirs(self.path(directory), exist_ok=True)
+        digest = getattr(content, 'content_hash', None)
+
+        if hasattr(content, 'temporary_file_path'):
+            # already on disk, move it rather than copy it
+            temp_path = content.temporary_file_path()
+            if digest is None:
+                digest = BlockHash.resume(temp_path).hexdigest()
+        else:
+            hasher = BlockHash()
+            fd, temp_path = tempfile.mkstemp(
+                dir=self.path(directory), suffix='.part'
+            )
+            try:
+                with os.fdopen(fd, 'wb') as temp:
+                    for chunk in content.chunks():
+                        if digest is None:
+                            hasher.update(chunk)
+                        temp.write(chunk)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+            digest = digest or hasher.hexdigest()
+
+        name = os.path.join(directory, digest + extension)
+        with self.lock():
+            if not self.exists(name):
+                file_move_safe(temp_path, self.path(name))
+                self._set_permissions(name)
+                return name
+        self._keep_until_commit(name, temp_path)
+        return name
+
+    def _keep_until_commit(self, name, temp_path):
+        """restore name from temp_path if it is deleted before commit
+
+        The recipe referencing a reused file is not committed yet, so a
+        concurrent delete of the last other reference may remove it.
+        Spares of rolled back saves are never restored, they are removed
+        by a later save once older than SPARE_MAX_AGE.
+        """
+        spares = os.path.join(self.location, '.spare')
+        os.makedirs(spares, exist_ok=True)
+        self._remove_stale_spares(spares)
+        fd, spare = tempfile.mkstemp(dir=spares)
+        os.close(fd)
+        file_move_safe(temp_path, spare, allow_overwrite=True)
+        # a moved file keeps its mtime, which may be that of an old upload
+        os.utime(spare)
+
+        def restore():
+            with self.lock():
+                if self.exists(name):
+                    os.remove(spare)
+                else:
+                    os.replace(spare, self.path(name))
+                    self._set_permissions(name)
+
+        transaction.on_commit(restore)
+
+    def _remove_stale_spares(self, spares):
+        cutoff = time.time() - SPARE_MAX_AGE
+        for entry in os.scandir(spares):
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+    def _set_permissions(self, name):
+        if self.file_permissions_mode is not None:
+            os.chmod(self.path(name), self.file_permissions_mode)
+
+    def get_available_name(self, name, max_length=None):
+        # the final name depends on the content, reusing it is intended
+        return name
@@ -0,0 +1,97 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import TokenCache, token_cache
+
+
+ME_URL = reverse('user:me')
+
+
+class TokenCacheTests(TestCase):
+    """test the token cache on its own"""
+
+    def test_lru_eviction(self):
+        """test that the least recently used entry is evicted"""
+        cache = TokenCache(max_size=2, ttl=60)
+        cache.set('a', 'token a')
+        cache.set('b', 'token b')
+        cache.get('a')
+        cache.set('c', 'token c')
+        self.assertEqual(cache.get('a'), 'token a')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_ttl_expiry(self):
+        """test that entries expire after the ttl"""
+        cache = TokenCache(ttl=10)
+        with patch('time.monotonic', return_value=100):
+            cache.set('a', 'token a')
+        with patch('time.monotonic', return_value=109):
+            self.assertEqual(cache.get('a'), 'token a')
+        with patch('time.monotonic', return_value=111):
+            self.assertIsNone(cache.get('a'))
+
+    def test_shared_tier(self):
+        """test that a second process finds entries in the shared tier"""
+        caches['default'].clear()
+        TokenCache(shared_cache='default').set('a', 'token a')
+        cache = TokenCache(shared_cache='default')
+        self.assertEqual(cache.get('a'), 'token a')
+        self.assertEqual(cache.get('a'), 'token a')
+        self.assertEqual(cache.stats()['shared_hits'], 1)
+        self.assertEqual(cache.stats()['hits'], 1)
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """test authenticating API requests through the token cache"""
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='cached@gmail.com',
+            password='test1234',
+            name='cached'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_second_request_skips_token_query(self):
+        """test that a cached token is not looked up again"""
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.data['email'], self.user.email)
+        self.assertEqual(token_cache.stats()['hits'], 1)
+        self.assertEqual(token_cache.stats()['misses'], 1)
+
+    def test_deleted_token_evicted(self):
+        """test that a deleted token stops authenticating"""
+        self.client.get(ME_URL)
+        self.token.delete()
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_evicted(self):
+        """test that deactivating a user stops their cached token"""
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_profile_update_evicted(self):
+        """test that updating the profile refreshes the cached user"""
+        self.client.get(ME_URL)
+        self.client.patch(ME_URL, {'name': 'renamed'})
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.data['name'], 'renamed')
@@ -1,22 +1,98 @@
-from unittest.mock import patch
+import json
+from io import StringIO
+from unittest.mock import MagicMock, patch
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
 from django.test import TestCase
 
+from core.management.commands.profile_startup import \
+    Command as ProfileCommand
+
 
 class CommandTests(TestCase):
 
     def test_wait_for_db_ready(self):
         """test waiting for db when db is available"""
         with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.return_value = True
-            call_command('wait_for_db')
+            call_command('wait_for_db', stdout=StringIO())
             self.assertEqual(gi.call_count, 1)
+            cursor = gi.return_value.cursor.return_value.__enter__
+            cursor.return_value.execute.assert_called_once_with('SELECT 1')
 
     @patch('time.sleep', return_value=True)
     def test_wait_for_db(self, ts):
         """test waiting for DB"""
         with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
-            call_command('wait_for_db')
+            gi.return_value.cursor.side_effect = \
+                [OperationalError] * 5 + [MagicMock()]
+            call_command('wait_for_db', stdout=StringIO())
             self.assertEqual(gi.call_count, 6)
+        delays = [call[0][0] for call in ts.call_args_list]
+        self.assertEqual(len(delays), 5)
+        self.assertLess(delays[0], 0.1)
+        self.assertGreater(delays[-1], delays[0])
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_timeout(self, ts):
+        """test the command fails once the timeout is spent"""
+        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
+            gi.return_value.cursor.side_effect = OperationalError
+            with self.assertRaises(CommandError):
+                call_command('wait_for_db', timeout=0, stdout=StringIO())
+            self.assertEqual(gi.call_count, 1)
+
+    def test_wait_for_several_databases(self):
+        """test every alias given is probed and reported"""
+        out = StringIO()
+        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
+            call_command(
+                'wait_for_db', database=['default', 'replica1'], stdout=out
+            )
+            self.assertEqual(
+                sorted(call[0][0] for call in gi.call_args_list),
+                ['default', 'replica1']
+            )
+        self.assertIn("'replica1' ready", out.getvalue())
+
+
+class ProfileStartupTests(TestCase):
+
+    def test_profile_startup_report(self):
+        """test import times and time to first request are reported"""
+        timings = {'import': 0.5, 'request': 0.1, 'status': '200 OK'}
+        stderr = '\n'.join([
+            'import time: self [us] | cumulative | imported package',
+            'import time:      1500 |       1500 |   django.conf',
+            'import time:      2000 |       3500 | app.wsgi',
+        ])
+        with patch('subprocess.run') as run:
+            run.return_value.returncode = 0
+            run.return_value.stdout = json.dumps(timings)
+            run.return_value.stderr = stderr
+            out = StringIO()
+            call_command('profile_startup', runs=1, stdout=out)
+        self.assertIn('-X', run.call_args[0][0])
+        self.assertIn('app.wsgi', out.getvalue())
+        self.assertIn('2 modules, 3.5ms importing', out.getvalue())
+        self.assertIn('time to first request: 600.0ms', out.getvalue())
+
+    def test_profile_startup_silent_failure(self):
+        """test a child exiting without output is reported"""
+        with patch('subprocess.run') as run:
+            run.return_value.returncode = -9
+            run.return_value.stdout = ''
+            run.return_value.stderr = ''
+            with self.assertRaisesMessage(CommandError, 'exit -9'):
+                call_command('profile_startup', runs=1, stdout=StringIO())
+            run.return_value.returncode = 0
+            with self.assertRaisesMessage(CommandError, 'no timings'):
+                call_command('profile_startup', runs=1, stdout=StringIO())
+
+    def test_heavy_modules_imported_lazily(self):
+        """test cold starts do not import Pillow or multiprocessing"""
+        _, imports = ProfileCommand().run_once('/api/recipe/')
+        modules = {module for _, _, module in imports}
+        self.assertIn('app.wsgi', modules)
+        self.assertNotIn('PIL', modules)
+        self.assertNotIn('multiprocessing', modules)
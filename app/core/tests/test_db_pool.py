@@ -0,0 +1,135 @@
+import threading
+from unittest.mock import Mock, patch
+
+from django.test import SimpleTestCase
+
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+from core.db.backends.postgresql.base import DatabaseWrapper
+from core.db.pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    healthy = True
+
+    def __init__(self):
+        self.closed = False
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """test the per process connection pool"""
+
+    def make_pool(self, **kwargs):
+        return ConnectionPool(
+            connect=FakeConnection,
+            close=lambda conn: setattr(conn, 'closed', True),
+            check=lambda conn: conn.healthy,
+            **kwargs
+        )
+
+    def test_connections_reused(self):
+        """test returned connections are handed out again"""
+        pool = self.make_pool()
+        conn = pool.getconn()
+        pool.putconn(conn)
+        self.assertIs(pool.getconn(), conn)
+        stats = pool.stats()
+        self.assertEqual(stats['created'], 1)
+        self.assertEqual(stats['checkouts'], 2)
+        self.assertEqual(stats['in_use'], 1)
+
+    def test_size_bounded(self):
+        """test checkouts past max_size time out"""
+        pool = self.make_pool(max_size=2, timeout=0.01)
+        pool.getconn()
+        pool.getconn()
+        with self.assertRaises(PoolTimeout):
+            pool.getconn()
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_waiters_get_returned_connections(self):
+        """test a checkout waits for a connection to be returned"""
+        pool = self.make_pool(max_size=1, timeout=5)
+        conn = pool.getconn()
+        timer = threading.Timer(0.05, pool.putconn, [conn])
+        timer.start()
+        self.assertIs(pool.getconn(), conn)
+        timer.join()
+        stats = pool.stats()
+        self.assertEqual(stats['waits'], 1)
+        self.assertGreater(stats['max_wait'], 0)
+
+    def test_unhealthy_connection_replaced(self):
+        """test idle connections failing the check are discarded"""
+        pool = self.make_pool(check_after=0)
+        conn = pool.getconn()
+        pool.putconn(conn)
+        conn.healthy = False
+        new = pool.getconn()
+        self.assertIsNot(new, conn)
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.stats()['discarded'], 1)
+
+    def test_check_skipped_for_recently_used(self):
+        """test connections used moments ago are not checked"""
+        pool = self.make_pool(check_after=30)
+        conn = pool.getconn()
+        pool.putconn(conn)
+        conn.healthy = False
+        self.assertIs(pool.getconn(), conn)
+
+    def test_max_lifetime(self):
+        """test connections older than max_lifetime are replaced"""
+        pool = self.make_pool(max_lifetime=60)
+        with patch('core.db.pool.time.monotonic', return_value=1000):
+            conn = pool.getconn()
+        with patch('core.db.pool.time.monotonic', return_value=1061):
+            pool.putconn(conn)
+            self.assertTrue(conn.closed)
+            self.assertIsNot(pool.getconn(), conn)
+
+    def test_discard(self):
+        """test broken connections are closed instead of pooled"""
+        pool = self.make_pool(max_size=1, timeout=0.01)
+        conn = pool.getconn()
+        pool.putconn(conn, discard=True)
+        self.assertTrue(conn.closed)
+        self.assertIsNot(pool.getconn(), conn)
+
+    def test_failed_connect_frees_slot(self):
+        """test a failing connect does not use up the pool"""
+        pool = self.make_pool(max_size=1, timeout=0.01)
+        with patch.object(pool, 'connect', side_effect=OSError):
+            with self.assertRaises(OSError):
+                pool.getconn()
+        self.assertIsInstance(pool.getconn(), FakeConnection)
+
+    def test_reset_after_fork(self):
+        """test a forked process does not reuse its parent connections"""
+        pool = self.make_pool()
+        conn = pool.getconn()
+        pool.putconn(conn)
+        with patch('core.db.pool.os.getpid', return_value=-1):
+            self.assertIsNot(pool.getconn(), conn)
+            self.assertFalse(conn.closed)
+
+
+class DatabaseWrapperCloseTests(SimpleTestCase):
+    """test which connections the backend returns to its pool"""
+
+    def close(self, **state):
+        wrapper = Mock(errors_occurred=False, in_atomic_block=False)
+        wrapper.configure_mock(**state)
+        wrapper.connection.closed = 0
+        wrapper.connection.get_transaction_status.return_value = \
+            TRANSACTION_STATUS_IDLE
+        DatabaseWrapper._close(wrapper)
+        return wrapper.pool.putconn.call_args[1]['discard']
+
+    def test_idle_connection_returned(self):
+        """test an idle connection goes back to the pool"""
+        self.assertFalse(self.close())
+
+    def test_connection_in_atomic_block_discarded(self):
+        """test a connection closed inside atomic is not reused"""
+        self.assertTrue(self.close(in_atomic_block=True))
@@ -0,0 +1,84 @@
+import datetime
+import io
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+
+DATA = {
+    'id': 1,
+    'title': 'Crème brûlée\u2028',
+    'price': Decimal('5.10'),
+    'created': datetime.datetime(
+        2020, 6, 8, 16, 53, 1, 123456, tzinfo=datetime.timezone.utc
+    ),
+    'label': gettext_lazy('sample'),
+    'tags': [{'id': 2, 'name': 'dessert'}],
+}
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """test the orjson renderer matches the stock JSON renderer"""
+
+    def test_matches_json_renderer(self):
+        """test output is byte for byte what JSONRenderer produces"""
+        self.assertEqual(
+            FastJSONRenderer().render(DATA), JSONRenderer().render(DATA)
+        )
+
+    def test_decimal_rendered_as_number(self):
+        """test raw decimals are encoded the way DRF encodes them"""
+        self.assertEqual(
+            FastJSONRenderer().render({'price': Decimal('5.10')}),
+            b'{"price":5.1}'
+        )
+
+    def test_indent(self):
+        """test indented output matches JSONRenderer"""
+        for indent in (2, 4):
+            context = {'indent': indent}
+            self.assertEqual(
+                FastJSONRenderer().render(DATA, renderer_context=context),
+                JSONRenderer().render(DATA, renderer_context=context)
+            )
+
+    def test_without_orjson(self):
+        """test the renderer falls back to the stdlib encoder"""
+        with patch('core.renderers.orjson', None):
+            self.assertEqual(
+                FastJSONRenderer().render(DATA), JSONRenderer().render(DATA)
+            )
+
+
+class FastJSONParserTests(SimpleTestCase):
+    """test the orjson parser"""
+
+    def parse(self, body, encoding='utf-8'):
+        return FastJSONParser().parse(
+            io.BytesIO(body), parser_context={'encoding': encoding}
+        )
+
+    def test_parse(self):
+        """test JSON bodies are decoded"""
+        self.assertEqual(
+            self.parse('{"title": "Crème", "tags": [1, 2]}'.encode()),
+            {'title': 'Crème', 'tags': [1, 2]}
+        )
+
+    def test_parse_other_encoding(self):
+        """test bodies in a declared non UTF-8 charset are decoded"""
+        body = '{"title": "Crème"}'.encode('latin-1')
+        self.assertEqual(self.parse(body, 'latin-1'), {'title': 'Crème'})
+
+    def test_invalid_json(self):
+        """test malformed bodies raise a parse error"""
+        for body in (b'{"title": ', b'{"price": NaN}', b'\xff'):
+            with self.assertRaises(ParseError):
+                self.parse(body)
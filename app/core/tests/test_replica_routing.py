@@ -0,0 +1,112 @@
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core.db import routers
+from core.middleware import ReplicaRoutingMiddleware
+from core.models import Recipe
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+@patch('core.db.routers.is_healthy', return_value=True)
+class ReplicaRoutingTests(SimpleTestCase):
+    """test reads are routed to replicas with read your writes"""
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.middleware = ReplicaRoutingMiddleware(self.read_database)
+
+    def read_database(self, request):
+        """stand in view reporting where a recipe read would go"""
+        return HttpResponse(router.db_for_read(Recipe))
+
+    def request(self, method, token=None, ip='10.0.0.1'):
+        extra = {'REMOTE_ADDR': ip}
+        if token:
+            extra['HTTP_AUTHORIZATION'] = f'Token {token}'
+        request = getattr(self.factory, method)('/api/recipe/', **extra)
+        return self.middleware(request).content.decode()
+
+    def test_safe_requests_read_from_replica(self, _):
+        """test GET requests read from a replica"""
+        self.assertEqual(self.request('get', 'abc'), 'replica')
+
+    def test_writes_use_primary(self, _):
+        """test writes and reads during writes use the primary"""
+        self.assertEqual(self.request('post', 'abc'), DEFAULT_DB_ALIAS)
+        self.assertEqual(
+            router.db_for_write(Recipe), DEFAULT_DB_ALIAS
+        )
+
+    def test_reads_pinned_after_write(self, _):
+        """test a client reads its own writes from the primary"""
+        self.request('post', 'abc')
+        self.assertEqual(self.request('get', 'abc'), DEFAULT_DB_ALIAS)
+        self.assertEqual(
+            self.request('get', 'other', ip='10.0.0.2'), 'replica'
+        )
+
+    def test_pin_expires(self, _):
+        """test pinning lasts REPLICA_PIN_SECONDS"""
+        with override_settings(REPLICA_PIN_SECONDS=0):
+            self.request('post', 'abc')
+        self.assertEqual(self.request('get', 'abc'), 'replica')
+
+    def test_anonymous_write_pins_address(self, _):
+        """test reads after a login read the new token from the primary"""
+        self.request('post')
+        self.assertEqual(self.request('get', 'new'), DEFAULT_DB_ALIAS)
+
+    def test_unhealthy_replica_falls_back(self, is_healthy):
+        """test reads use the primary when no replica is healthy"""
+        is_healthy.return_value = False
+        self.assertEqual(self.request('get', 'abc'), DEFAULT_DB_ALIAS)
+
+    def test_transactions_read_from_primary(self, _):
+        """test reads inside a transaction stay on the primary"""
+        routers.set_replica_reads(True)
+        try:
+            with patch.object(connections[DEFAULT_DB_ALIAS],
+                              'in_atomic_block', True):
+                self.assertEqual(
+                    router.db_for_read(Recipe), DEFAULT_DB_ALIAS
+                )
+        finally:
+            routers.set_replica_reads(False)
+
+    def test_primary_reads_block(self, _):
+        """test reads filling a cache use the primary within a request"""
+        routers.set_replica_reads(True)
+        try:
+            with routers.primary_reads():
+                self.assertEqual(
+                    router.db_for_read(Recipe), DEFAULT_DB_ALIAS
+                )
+            self.assertEqual(router.db_for_read(Recipe), 'replica')
+        finally:
+            routers.set_replica_reads(False)
+
+    def test_outside_requests_use_primary(self, _):
+        """test reads outside a request, e.g. commands, use the primary"""
+        self.assertEqual(router.db_for_read(Recipe), DEFAULT_DB_ALIAS)
+
+
+class ReplicaHealthTests(SimpleTestCase):
+    """test replica health checks"""
+
+    def setUp(self):
+        routers._health.clear()
+
+    @override_settings(REPLICA_HEALTH_TTL=60)
+    def test_health_cached(self):
+        """test a failed replica is not retried until the ttl passes"""
+        connection = MagicMock()
+        connection.ensure_connection.side_effect = OperationalError
+        with patch('core.db.routers.connections', {'replica': connection}):
+            self.assertFalse(routers.is_healthy('replica'))
+            self.assertFalse(routers.is_healthy('replica'))
+        connection.ensure_connection.assert_called_once()
@@ -0,0 +1,93 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from django.core.files.base import ContentFile
+from django.test import TestCase
+
+from core.storage import BlockHash, ContentAddressedStorage
+
+
+class ContentAddressedStorageTests(TestCase):
+    """test storing files under the hash of their content"""
+
+    def setUp(self) -> None:
+        self.location = tempfile.mkdtemp()
+        self.storage = ContentAddressedStorage(location=self.location)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.location, ignore_errors=True)
+
+    def test_named_by_content_hash(self):
+        """test saved files are named after their block hash"""
+        name = self.storage.save('uploads/a.JPG', ContentFile(b'content'))
+        digest = hashlib.sha256(
+            hashlib.sha256(b'content').digest()
+        ).hexdigest()
+        self.assertEqual(name, f'uploads/{digest}.jpg')
+        with self.storage.open(name) as stored:
+            self.assertEqual(stored.read(), b'content')
+
+    def test_duplicate_content_shares_file(self):
+        """test saving identical content twice returns the same name"""
+        first = self.storage.save('uploads/a.jpg', ContentFile(b'same'))
+        second = self.storage.save('uploads/b.jpg', ContentFile(b'same'))
+        other = self.storage.save('uploads/c.jpg', ContentFile(b'other'))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertEqual(len(self.storage.listdir('uploads')[1]), 2)
+
+    def test_precomputed_hash_used(self):
+        """test content carrying its hash is not hashed again"""
+        content = ContentFile(b'content')
+        content.content_hash = 'abc'
+        name = self.storage.save('uploads/a.jpg', content)
+        self.assertEqual(name, 'uploads/abc.jpg')
+
+    def test_reused_file_restored_on_commit(self):
+        """test a file deleted before the reusing save commits comes back"""
+        name = self.storage.save('uploads/a.jpg', ContentFile(b'same'))
+        callbacks = []
+        with patch('core.storage.transaction.on_commit', callbacks.append):
+            self.storage.save('uploads/b.jpg', ContentFile(b'same'))
+        self.storage.delete(name)
+        for callback in callbacks:
+            callback()
+        with self.storage.open(name) as stored:
+            self.assertEqual(stored.read(), b'same')
+        self.assertEqual(os.listdir(os.path.join(self.location, '.spare')),
+                         [])
+
+    def test_stale_spares_removed(self):
+        """test spares left by rolled back saves are eventually removed"""
+        self.storage.save('uploads/a.jpg', ContentFile(b'same'))
+        spares = os.path.join(self.location, '.spare')
+        os.makedirs(spares)
+        stale = os.path.join(spares, 'stale')
+        with open(stale, 'wb'):
+            pass
+        os.utime(stale, (0, 0))
+        with patch('core.storage.transaction.on_commit'):
+            self.storage.save('uploads/b.jpg', ContentFile(b'same'))
+        self.assertFalse(os.path.exists(stale))
+        self.assertEqual(len(os.listdir(spares)), 1)
+
+
+@patch('core.storage.BLOCK_SIZE', 4)
+class BlockHashTests(TestCase):
+    """test hashing files block by block"""
+
+    def test_resume_matches_single_pass(self):
+        """test resuming from saved digests gives the same hash"""
+        hasher = BlockHash()
+        hasher.update(b'0123456789')
+        self.assertEqual(len(hasher.digests), 64)
+        with tempfile.NamedTemporaryFile() as ntf:
+            ntf.write(b'0123456789')
+            ntf.flush()
+            resumed = BlockHash.resume(ntf.name, hasher.digests[:32])
+            self.assertEqual(resumed.hexdigest(), hasher.hexdigest())
+            stale = BlockHash.resume(ntf.name, hasher.digests * 3)
+            self.assertEqual(stale.hexdigest(), hasher.hexdigest())
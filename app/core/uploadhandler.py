@@ -0,0 +1,24 @@
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+from core.storage import BlockHash
+
+
+class HashingFileUploadHandler(TemporaryFileUploadHandler):
+    """write large uploads to a temporary file, hashing them as they arrive
+
+    The digest is handed to ContentAddressedStorage as content_hash, so
+    the file is not read again to name it.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.hasher = BlockHash()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.content_hash = self.hasher.hexdigest()
+        return file
@@ -0,0 +1,85 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+
+from django.conf import settings
+
+from core.db.routers import primary_reads
+from recipe.cache import get_version
+
+
+class PrefixIndex:
+    """sorted index of every word suffix of a set of names
+
+    Each name is indexed once per word, so 'pow' finds 'Curry powder'.
+    A prefix lookup is a binary search plus a scan over the matches.
+    """
+
+    def __init__(self, items):
+        entries = []
+        for pk, name in items:
+            words = name.lower().split()
+            for position in range(len(words)):
+                entries.append(
+                    (' '.join(words[position:]), position, name, pk)
+                )
+        entries.sort()
+        self.keys = [entry[0] for entry in entries]
+        self.entries = entries
+
+    def search(self, prefix, limit):
+        """return up to limit (id, name) pairs matching prefix
+
+        Names starting with the prefix come first, then names with a
+        later word starting with it, each alphabetically.
+        """
+        prefix = ' '.join(prefix.lower().split())
+        if not prefix:
+            return []
+        best = {}
+        for key, position, name, pk in \
+                self.entries[bisect_left(self.keys, prefix):]:
+            if not key.startswith(prefix):
+                break
+            if pk not in best or position < best[pk][0]:
+                best[pk] = (position, name)
+        ranked = sorted(
+            best.items(),
+            key=lambda item: (item[1][0] > 0, item[1][1].lower(), item[0])
+        )
+        return [(pk, name) for pk, (_, name) in ranked[:limit]]
+
+
+_indexes = OrderedDict()
+_lock = threading.Lock()
+
+
+def get_index(queryset, user_id):
+    """return the prefix index of the user's objects in queryset
+
+    Indexes are kept per process and rebuilt when the user's cache
+    version moves, which every write to their recipe data does. Without
+    a shared cache other processes never see that version move, so an
+    index is also rebuilt once it is AUTOCOMPLETE_TIMEOUT seconds old.
+    Indexes are built from the primary so replica lag is never cached.
+    """
+    key = (queryset.model._meta.label, user_id)
+    version = get_version(user_id)
+    now = time.monotonic()
+    timeout = getattr(settings, 'AUTOCOMPLETE_TIMEOUT', 30)
+    with _lock:
+        cached = _indexes.get(key)
+        if cached and cached[0] == version and now - cached[1] < timeout:
+            _indexes.move_to_end(key)
+            return cached[2]
+    with primary_reads():
+        index = PrefixIndex(
+            queryset.filter(user_id=user_id).values_list('id', 'name')
+        )
+    with _lock:
+        _indexes[key] = (version, now, index)
+        _indexes.move_to_end(key)
+        while len(_indexes) > getattr(settings, 'AUTOCOMPLETE_USERS', 1000):
+            _indexes.popitem(last=False)
+    return index
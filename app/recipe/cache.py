@@ -0,0 +1,45 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+VERSION_KEY = 'recipe:version:{}'
+
+
+def get_version(user_id):
+    """return the current cache generation of a user's recipe data"""
+    key = VERSION_KEY.format(user_id)
+    version = cache.get(key)
+    if version is None:
+        # start from the clock so a lost counter never reuses old keys
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(user_id):
+    """invalidate every cached response of a user"""
+    key = VERSION_KEY.format(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, int(time.time() * 1000), None)
+
+
+def list_cache_key(request, basename):
+    """return the cache key and ETag for a list request"""
+    raw = '{}:{}:{}:{}'.format(
+        basename,
+        request.user.id,
+        get_version(request.user.id),
+        request.build_absolute_uri(),
+    )
+    digest = hashlib.md5(raw.encode()).hexdigest()
+    return f'recipe:list:{digest}', f'"{digest}"'
+
+
+def list_cache_timeout():
+    """return how long cached list responses are kept"""
+    return getattr(settings, 'API_LIST_CACHE_TIMEOUT', 300)
@@ -0,0 +1,53 @@
+from django.db.models import Prefetch, prefetch_related_objects
+
+from core.models import Tag, Ingredient
+from core.renderers import dumps
+from recipe.serializers import RecipeDetailSerializer
+
+
+EXPORT_CHUNK_SIZE = 500
+
+
+def serialize_chunks(queryset, chunk_size=None):
+    """yield serialized recipes one chunk at a time
+
+    The recipes are read through a server side cursor. iterator() skips
+    prefetch_related, so tags and ingredients are prefetched per chunk
+    instead, keeping both memory and query count bounded by the chunk.
+    """
+    chunk_size = chunk_size or EXPORT_CHUNK_SIZE
+    chunk = []
+    for recipe in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(recipe)
+        if len(chunk) == chunk_size:
+            yield _serialize(chunk)
+            chunk = []
+    if chunk:
+        yield _serialize(chunk)
+
+
+def _serialize(recipes):
+    """serialize a list of recipes along with their tags and ingredients"""
+    prefetch_related_objects(
+        recipes,
+        Prefetch('ingredients', Ingredient.objects.only('id', 'name')),
+        Prefetch('tags', Tag.objects.only('id', 'name')),
+    )
+    return RecipeDetailSerializer(recipes, many=True).data
+
+
+def stream_json(queryset, chunk_size=None):
+    """yield the recipes as one JSON array"""
+    yield b'['
+    separator = b''
+    for chunk in serialize_chunks(queryset, chunk_size):
+        # a whole chunk is a list, encode it at once and drop its brackets
+        yield separator + dumps(chunk)[1:-1]
+        separator = b','
+    yield b']'
+
+
+def stream_ndjson(queryset, chunk_size=None):
+    """yield the recipes as newline delimited JSON, one per line"""
+    for chunk in serialize_chunks(queryset, chunk_size):
+        yield b''.join(dumps(item) + b'\n' for item in chunk)
@@ -0,0 +1,176 @@
+import logging
+import os
+import threading
+from functools import partial
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from core.models import Recipe
+
+
+# name: (bounding box, Pillow format, file extension)
+VARIANTS = {
+    'thumbnail': ((320, 320), 'JPEG', 'jpg'),
+    'webp': ((1280, 1280), 'WEBP', 'webp'),
+}
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def variant_name(name, variant):
+    """return the storage name of a variant of the image stored at name"""
+    directory, filename = os.path.split(name)
+    stem = os.path.splitext(filename)[0]
+    extension = VARIANTS[variant][2]
+    return os.path.join(directory, 'variants', f'{stem}_{variant}.{extension}')
+
+
+def image_owned(user, name):
+    """return whether a recipe of user uses the image stored at name
+
+    Variants belong to whoever owns the image they were made from.
+    """
+    directory, filename = os.path.split(name)
+    stem = os.path.splitext(filename)[0]
+    if os.path.basename(directory) == 'variants':
+        directory = os.path.dirname(directory)
+        stem = stem.rsplit('_', 1)[0]
+    return Recipe.objects.filter(
+        user=user, image__startswith=os.path.join(directory, f'{stem}.')
+    ).exists()
+
+
+def variant_urls(name):
+    """return the url of every variant of name, None until it is ready"""
+    urls = {}
+    for variant in VARIANTS:
+        path = variant_name(name, variant)
+        urls[variant] = default_storage.url(path) \
+            if default_storage.exists(path) else None
+    return urls
+
+
+def generate_variants(source, outputs):
+    """resize the image file at source into each (variant, path) output
+
+    Runs in a worker process, so it only touches files, not Django.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as original:
+        # decode JPEGs at a reduced scale when that is enough for the
+        # largest variant, a draft only applies before the first load
+        largest = max(VARIANTS[variant][0] for variant, _ in outputs)
+        original.draft('RGB', largest)
+        oriented = ImageOps.exif_transpose(original)
+        for variant, path in outputs:
+            size, image_format, _ = VARIANTS[variant]
+            image = oriented.copy()
+            image.thumbnail(size, Image.LANCZOS)
+            if image.mode not in ('RGB', 'RGBA') or image_format == 'JPEG':
+                image = image.convert('RGB')
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            partial = f'{path}.part'
+            image.save(partial, image_format, quality=85)
+            os.replace(partial, path)
+
+
+def get_executor():
+    """return the process pool resizing images, starting it if needed"""
+    # imported here to keep multiprocessing out of worker start up
+    from concurrent.futures import ProcessPoolExecutor
+
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.RECIPE_IMAGE_WORKERS
+            )
+        return _executor
+
+
+def reset_executor(executor):
+    """forget a broken pool so the next image starts a new one"""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+
+
+def submit_variants(source, outputs):
+    """queue generate_variants on the pool, restarting it if broken"""
+    from concurrent.futures.process import BrokenProcessPool
+
+    executor = get_executor()
+    try:
+        future = executor.submit(generate_variants, source, outputs)
+    except BrokenProcessPool:
+        reset_executor(executor)
+        executor = get_executor()
+        future = executor.submit(generate_variants, source, outputs)
+    future.add_done_callback(partial(log_variants_failure, executor, source))
+    return future
+
+
+def log_variants_failure(executor, source, future):
+    """log a failed variants job, dropping the pool if a worker died"""
+    from concurrent.futures.process import BrokenProcessPool
+
+    if future.cancelled() or future.exception() is None:
+        return
+    exception = future.exception()
+    logger.error('generating variants of %s failed', source,
+                 exc_info=exception)
+    if isinstance(exception, BrokenProcessPool):
+        reset_executor(executor)
+
+
+def schedule_variants(name):
+    """generate the variants of the image at name once committed
+
+    Images shared with other recipes already have their variants and are
+    skipped. With RECIPE_IMAGE_WORKERS set to 0 the variants are generated
+    inline.
+    """
+    source = default_storage.path(name)
+
+    def submit():
+        # checked once committed, a release of the shared image may have
+        # deleted the variants before the image was restored
+        outputs = [
+            (variant, default_storage.path(variant_name(name, variant)))
+            for variant in VARIANTS
+        ]
+        outputs = [(variant, path) for variant, path in outputs
+                   if not os.path.exists(path)]
+        if not outputs:
+            return
+        if getattr(settings, 'RECIPE_IMAGE_WORKERS', 2):
+            submit_variants(source, outputs)
+        else:
+            generate_variants(source, outputs)
+
+    transaction.on_commit(submit)
+
+
+def release_image(name):
+    """delete the image at name and its variants once no recipe uses it"""
+    if not name:
+        return
+
+    def delete():
+        # a save reusing name between the check and the delete restores
+        # it once committed, see ContentAddressedStorage
+        with default_storage.lock():
+            if Recipe.objects.filter(image=name).exists():
+                return
+            default_storage.delete(name)
+            for variant in VARIANTS:
+                default_storage.delete(variant_name(name, variant))
+
+    transaction.on_commit(delete)
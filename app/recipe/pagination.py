@@ -0,0 +1,20 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class RecipeCursorPagination(CursorPagination):
+    """keyset pagination for recipes, newest first"""
+    ordering = ('-id', )
+    page_size = getattr(settings, 'API_PAGE_SIZE', 100)
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'API_MAX_PAGE_SIZE', 500)
+
+
+class RecipeAttrCursorPagination(RecipeCursorPagination):
+    """keyset pagination for tags and ingredients, ordered by name"""
+    ordering = ('-name', '-id')
+
+
+class RecipeSearchPagination(RecipeCursorPagination):
+    """keyset pagination for search results, most relevant first"""
+    ordering = ('-rank', '-id')
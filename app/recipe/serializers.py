@@ -1,5 +1,137 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import router, connections
+from django.db.models import prefetch_related_objects
+from django.utils import timezone
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
 from core.models import Tag, Ingredient, Recipe
+from core.signals import bulk_saved
+from recipe.images import variant_urls
+from recipe.uploads import check_image_limits
+
+
+class UserOwnedManyRelatedField(serializers.ManyRelatedField):
+    """many related field resolving all submitted pks in one query"""
+
+    def to_internal_value(self, data):
+        """return the objects for data, rejecting missing or foreign pks"""
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        queryset = self.child_relation.get_queryset()
+        pk_field = queryset.model._meta.pk
+        pks = []
+        for value in data:
+            if isinstance(value, bool):
+                self.child_relation.fail(
+                    'incorrect_type', data_type=type(value).__name__
+                )
+            try:
+                pks.append(pk_field.to_python(value))
+            except DjangoValidationError:
+                self.child_relation.fail(
+                    'incorrect_type', data_type=type(value).__name__
+                )
+        found = queryset.in_bulk(set(pks))
+        missing = [pk for pk in pks if pk not in found]
+        if missing:
+            raise serializers.ValidationError(
+                f'Invalid pks {missing} - objects do not exist.',
+                code='does_not_exist'
+            )
+        return [found[pk] for pk in pks]
+
+
+class UserOwnedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """primary key field limited to objects of the requesting user"""
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        """wrap the field in a related field that validates in bulk"""
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return UserOwnedManyRelatedField(**list_kwargs)
+
+    def get_queryset(self):
+        """return the objects owned by the authenticated user"""
+        request = self.context.get('request')
+        if request is None:
+            return super().get_queryset().none()
+        return super().get_queryset().filter(user=request.user)
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """list serializer that writes all items with bulk queries"""
+
+    def create(self, validated_data):
+        """create every item, with its many to many rows, in bulk"""
+        model = self.child.Meta.model
+        relations = [self._pop_relations(attrs) for attrs in validated_data]
+        objs = [model(**attrs) for attrs in validated_data]
+        db = router.db_for_write(model)
+        if connections[db].features.can_return_rows_from_bulk_insert:
+            model.objects.using(db).bulk_create(objs)
+        else:
+            # the primary keys are needed for the through table rows
+            for obj in objs:
+                obj.save(using=db)
+        self._set_relations(objs, relations, replace=False)
+        bulk_saved.send(sender=model, instances=objs, created=True)
+        return objs
+
+    def update(self, instances, validated_data):
+        """update every instance with its item in bulk"""
+        model = self.child.Meta.model
+        relations = [self._pop_relations(attrs) for attrs in validated_data]
+        now = timezone.now()
+        fields = {'updated_at'}
+        for instance, attrs in zip(instances, validated_data):
+            for attr, value in attrs.items():
+                setattr(instance, attr, value)
+            instance.updated_at = now
+            fields.update(attrs)
+        model.objects.bulk_update(instances, fields)
+        self._set_relations(instances, relations)
+        bulk_saved.send(sender=model, instances=instances, created=False)
+        return instances
+
+    def _pop_relations(self, attrs):
+        """remove and return the many to many values of an item"""
+        model = self.child.Meta.model
+        return {
+            field.name: attrs.pop(field.name)
+            for field in model._meta.many_to_many if field.name in attrs
+        }
+
+    def _set_relations(self, objs, relations, replace=True):
+        """set many to many rows with one delete and one insert"""
+        model = self.child.Meta.model
+        for field in model._meta.many_to_many:
+            through = field.remote_field.through
+            source = field.m2m_field_name()
+            target = field.m2m_reverse_field_name()
+            changed = [
+                (obj, related[field.name])
+                for obj, related in zip(objs, relations)
+                if field.name in related
+            ]
+            if not changed:
+                continue
+            if replace:
+                through.objects.filter(**{
+                    f'{source}__in': [obj for obj, _ in changed]
+                }).delete()
+            through.objects.bulk_create([
+                through(**{source: obj, target: value})
+                for obj, values in changed for value in values
+            ], ignore_conflicts=True)
+        if model._meta.many_to_many:
+            prefetch_related_objects(
+                objs, *[field.name for field in model._meta.many_to_many]
+            )
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -9,6 +141,7 @@ class TagSerializer(serializers.ModelSerializer):
         model = Tag
         fields = ('id', 'name')
         read_only_fields = ('id', )
+        list_serializer_class = BulkListSerializer
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -18,15 +151,32 @@ class IngredientSerializer(serializers.ModelSerializer):
         model = Ingredient
         fields = ('id', 'name')
         read_only_fields = ('id', )
+        list_serializer_class = BulkListSerializer
+
+
+class TagUsageSerializer(TagSerializer):
+    """serializer for tags with the number of recipes using them"""
+    recipe_count = serializers.IntegerField(read_only=True)
+
+    class Meta(TagSerializer.Meta):
+        fields = TagSerializer.Meta.fields + ('recipe_count', )
+
+
+class IngredientUsageSerializer(IngredientSerializer):
+    """serializer for ingredients with the number of recipes using them"""
+    recipe_count = serializers.IntegerField(read_only=True)
+
+    class Meta(IngredientSerializer.Meta):
+        fields = IngredientSerializer.Meta.fields + ('recipe_count', )
 
 
 class RecipeSerializer(serializers.ModelSerializer):
     """serializer for recipe objects"""
-    ingredients = serializers.PrimaryKeyRelatedField(
+    ingredients = UserOwnedPrimaryKeyRelatedField(
         many=True,
         queryset=Ingredient.objects.all()
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = UserOwnedPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all()
     )
@@ -38,9 +188,48 @@ class RecipeSerializer(serializers.ModelSerializer):
             'price', 'link',
         )
         read_only_fields = ('id', )
+        list_serializer_class = BulkListSerializer
 
 
-class RecipeDetailSerializer(RecipeSerializer):
+class RecipeImageVariantsMixin(serializers.Serializer):
+    """expose the urls of the resized variants of the recipe image"""
+    image_variants = serializers.SerializerMethodField()
+
+    def get_image_variants(self, obj):
+        """return variant urls, None for variants still being generated"""
+        if not obj.image:
+            return None
+        request = self.context.get('request')
+        urls = variant_urls(obj.image.name)
+        if request is None:
+            return urls
+        return {
+            variant: url and request.build_absolute_uri(url)
+            for variant, url in urls.items()
+        }
+
+
+class RecipeDetailSerializer(RecipeImageVariantsMixin, RecipeSerializer):
     """serialize a recipe detail"""
     ingredients = IngredientSerializer(many=True, read_only=True)
     tags = TagSerializer(many=True, read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ('image', 'image_variants')
+        read_only_fields = ('id', 'image')
+
+
+class RecipeImageSerializer(RecipeImageVariantsMixin,
+                            serializers.ModelSerializer):
+    """serializer for uploading images to recipes"""
+
+    class Meta:
+        model = Recipe
+        fields = ('id', 'image', 'image_variants')
+        read_only_fields = ('id', )
+        extra_kwargs = {'image': {'required': True}}
+
+    def validate_image(self, value):
+        """reject images over the configured size limits"""
+        check_image_limits(value.size, *value.image.size)
+        return value
@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from core.models import Tag, Ingredient, Recipe
+from core.signals import bulk_saved
+from recipe.cache import bump_version
+from recipe.images import release_image
+
+
+def invalidate(user_id):
+    """bump the cache generation of a user now and once committed
+
+    A request reading between the two bumps can still see rows from
+    before the commit and cache them under the first new version, the
+    bump after commit retires that version.
+    """
+    bump_version(user_id)
+    transaction.on_commit(lambda: bump_version(user_id))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_user_cache(sender, instance, **kwargs):
+    """invalidate cached responses of the owner of a changed object"""
+    invalidate(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_user_cache_relations(sender, instance, action, **kwargs):
+    """invalidate cached responses when recipe relations change"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate(instance.user_id)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def start_user_cache(sender, instance, created, **kwargs):
+    """start new users on a fresh cache generation"""
+    if created:
+        bump_version(instance.id)
+
+
+@receiver(bulk_saved)
+def invalidate_user_cache_bulk(sender, instances, **kwargs):
+    """invalidate cached responses of the owners of bulk saved objects"""
+    for user_id in {obj.user_id for obj in instances}:
+        invalidate(user_id)
+
+
+@receiver(post_delete, sender=Recipe)
+def release_recipe_image(sender, instance, **kwargs):
+    """delete the image of a deleted recipe unless others share it"""
+    release_image(instance.image.name)
@@ -0,0 +1,100 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient
+from recipe.autocomplete import PrefixIndex
+from recipe.tests.utils import AuthenticatedApiTestCase
+
+
+TAGS_AUTOCOMPLETE_URL = reverse('recipe:tag-autocomplete')
+INGREDIENTS_AUTOCOMPLETE_URL = reverse('recipe:ingredient-autocomplete')
+
+
+class PrefixIndexTests(TestCase):
+    """test the prefix index on its own"""
+
+    def test_name_prefix_ranked_first(self):
+        """test that whole name prefixes rank above word prefixes"""
+        index = PrefixIndex([
+            (1, 'Curry powder'), (2, 'Potato'), (3, 'powdered sugar'),
+            (4, 'Salt'),
+        ])
+        self.assertEqual(
+            index.search('po', 10),
+            [(2, 'Potato'), (3, 'powdered sugar'), (1, 'Curry powder')]
+        )
+
+    def test_multi_word_prefix_and_limit(self):
+        """test multi word prefixes, case and limit"""
+        index = PrefixIndex([(1, 'Green Chilli'), (2, 'Green Chard'),
+                             (3, 'Green Beans')])
+        self.assertEqual(index.search('  GREEN   ch', 10),
+                         [(2, 'Green Chard'), (1, 'Green Chilli')])
+        self.assertEqual(index.search('green', 1), [(3, 'Green Beans')])
+        self.assertEqual(index.search('', 10), [])
+
+
+class AutocompleteApiTests(AuthenticatedApiTestCase):
+    """test the tag and ingredient autocomplete endpoints"""
+    email = 'autocomplete@gmail.com'
+
+    def test_login_required(self):
+        """test that login is required"""
+        res = APIClient().get(TAGS_AUTOCOMPLETE_URL, {'q': 'a'})
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_autocomplete_tags(self):
+        """test that matching tags of the user are returned"""
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        Tag.objects.create(user=self.user, name='Dessert')
+        other = get_user_model().objects.create_user(
+            email="other@gmail.com",
+            password="test123"
+        )
+        Tag.objects.create(user=other, name='Vegetarian')
+        res = self.client.get(TAGS_AUTOCOMPLETE_URL, {'q': 've'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [{'id': vegan.id, 'name': 'Vegan'}])
+
+    def test_cached_index_skips_database(self):
+        """test that a warm index answers without queries"""
+        Ingredient.objects.create(user=self.user, name='Salt')
+        self.client.get(INGREDIENTS_AUTOCOMPLETE_URL, {'q': 's'})
+        with self.assertNumQueries(0):
+            res = self.client.get(INGREDIENTS_AUTOCOMPLETE_URL, {'q': 'sa'})
+        self.assertEqual(res.data[0]['name'], 'Salt')
+
+    def test_index_refreshed_on_change(self):
+        """test that new and renamed objects show up"""
+        tag = Tag.objects.create(user=self.user, name='Lunch')
+        self.client.get(TAGS_AUTOCOMPLETE_URL, {'q': 'l'})
+        tag.name = 'Brunch'
+        tag.save()
+        Tag.objects.create(user=self.user, name='Breakfast')
+        res = self.client.get(TAGS_AUTOCOMPLETE_URL, {'q': 'br'})
+        self.assertEqual([item['name'] for item in res.data],
+                         ['Breakfast', 'Brunch'])
+
+    def test_index_expires(self):
+        """test that a change the version missed shows up after the ttl"""
+        with patch('recipe.autocomplete.time.monotonic', return_value=100):
+            self.client.get(TAGS_AUTOCOMPLETE_URL, {'q': 'l'})
+        with patch('recipe.signals.bump_version'):
+            Tag.objects.create(user=self.user, name='Lunch')
+        with patch('recipe.autocomplete.time.monotonic', return_value=110):
+            res = self.client.get(TAGS_AUTOCOMPLETE_URL, {'q': 'l'})
+        self.assertEqual(res.data, [])
+        with patch('recipe.autocomplete.time.monotonic', return_value=131):
+            res = self.client.get(TAGS_AUTOCOMPLETE_URL, {'q': 'l'})
+        self.assertEqual([item['name'] for item in res.data], ['Lunch'])
+
+    def test_invalid_limit(self):
+        """test that a non numeric limit is rejected"""
+        res = self.client.get(TAGS_AUTOCOMPLETE_URL, {'q': 'a', 'limit': 'x'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,134 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.tests.utils import AuthenticatedApiTestCase, sample_recipe
+
+
+TAGS_BULK_URL = reverse('recipe:tag-bulk')
+INGREDIENTS_BULK_URL = reverse('recipe:ingredient-bulk')
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+
+
+class PublicBulkApiTests(TestCase):
+    """test unauthenticated bulk API"""
+
+    def test_auth_required(self):
+        """test that authentication is required"""
+        res = APIClient().post(TAGS_BULK_URL, [], format='json')
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateBulkApiTests(AuthenticatedApiTestCase):
+    """test bulk writes for the authenticated user"""
+    email = 'bulk@gmail.com'
+
+    def test_bulk_create_tags(self):
+        """test creating many tags in one request"""
+        payload = [{'name': f'tag {i}'} for i in range(20)]
+        res = self.client.post(TAGS_BULK_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 20)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 20)
+
+    def test_bulk_create_reports_item_errors(self):
+        """test that one invalid item rejects the batch with its error"""
+        payload = [{'name': 'Salt'}, {'name': ''}, {'name': 'Pepper'}]
+        res = self.client.post(INGREDIENTS_BULK_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('name', res.data[1])
+        self.assertFalse(Ingredient.objects.exists())
+
+    def test_bulk_create_requires_list(self):
+        """test that a single object is rejected"""
+        res = self.client.post(TAGS_BULK_URL, {'name': 'a'}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(API_MAX_BULK_SIZE=3)
+    def test_bulk_create_too_large(self):
+        """test that creating more than the bulk limit is rejected"""
+        payload = [{'name': f'tag {i}'} for i in range(4)]
+        res = self.client.post(TAGS_BULK_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('at most 3', res.data['non_field_errors'][0])
+        self.assertFalse(Tag.objects.exists())
+
+    def test_bulk_create_recipes_with_relations(self):
+        """test creating recipes along with their tags and ingredients"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ingredient = Ingredient.objects.create(user=self.user, name='Kale')
+        payload = [
+            {
+                'title': f'recipe {i}',
+                'time_minutes': 10,
+                'price': '5.00',
+                'tags': [tag.id],
+                'ingredients': [ingredient.id],
+            }
+            for i in range(5)
+        ]
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipes = Recipe.objects.filter(user=self.user)
+        self.assertEqual(recipes.count(), 5)
+        for recipe in recipes:
+            self.assertEqual(list(recipe.tags.all()), [tag])
+            self.assertEqual(list(recipe.ingredients.all()), [ingredient])
+        self.assertEqual(res.data[0]['tags'], [tag.id])
+
+    def test_bulk_update_recipes(self):
+        """test partially updating many recipes"""
+        old_tag = Tag.objects.create(user=self.user, name='Old')
+        new_tag = Tag.objects.create(user=self.user, name='New')
+        recipes = []
+        for i in range(3):
+            recipe = sample_recipe(self.user, title=str(i))
+            recipe.tags.add(old_tag)
+            recipes.append(recipe)
+        payload = [
+            {'id': recipes[0].id, 'title': 'renamed'},
+            {'id': recipes[1].id, 'tags': [new_tag.id]},
+        ]
+        res = self.client.patch(RECIPES_BULK_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        for recipe in recipes:
+            recipe.refresh_from_db()
+        self.assertEqual(recipes[0].title, 'renamed')
+        self.assertEqual(list(recipes[0].tags.all()), [old_tag])
+        self.assertEqual(list(recipes[1].tags.all()), [new_tag])
+        self.assertEqual(recipes[2].title, '2')
+
+    def test_bulk_update_other_users_object(self):
+        """test that objects of other users cannot be bulk updated"""
+        other = get_user_model().objects.create_user(
+            email="other@gmail.com",
+            password="test123"
+        )
+        tag = Tag.objects.create(user=other, name='Theirs')
+        payload = [{'id': tag.id, 'name': 'Mine'}]
+        res = self.client.patch(TAGS_BULK_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'Theirs')
+
+    def test_bulk_delete(self):
+        """test deleting many objects by id"""
+        tags = [Tag.objects.create(user=self.user, name=str(i))
+                for i in range(3)]
+        payload = [tags[0].id, tags[2].id]
+        res = self.client.delete(TAGS_BULK_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(list(Tag.objects.all()), [tags[1]])
+
+    def test_bulk_delete_missing_id(self):
+        """test that deleting an unknown id deletes nothing"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        payload = [tag.id, tag.id + 100]
+        res = self.client.delete(TAGS_BULK_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(Tag.objects.filter(id=tag.id).exists())
@@ -0,0 +1,107 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils.http import http_date
+
+from rest_framework import status
+
+from core.models import Tag
+from recipe.tests.utils import AuthenticatedApiTestCase, sample_recipe
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    """return recipe url"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class ConditionalRecipeApiTests(AuthenticatedApiTestCase):
+    """test ETag and Last-Modified handling on recipe endpoints"""
+    email = 'conditional@gmail.com'
+
+    def test_detail_not_modified(self):
+        """test that a matching ETag returns 304 from one query"""
+        recipe = sample_recipe(self.user)
+        res = self.client.get(detail_url(recipe.id))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('Last-Modified', res)
+        with self.assertNumQueries(1):
+            res = self.client.get(
+                detail_url(recipe.id), HTTP_IF_NONE_MATCH=res['ETag']
+            )
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_if_modified_since(self):
+        """test that If-Modified-Since is honoured"""
+        recipe = sample_recipe(self.user)
+        later = http_date((recipe.updated_at + timedelta(days=1)).timestamp())
+        res = self.client.get(
+            detail_url(recipe.id), HTTP_IF_MODIFIED_SINCE=later
+        )
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        earlier = http_date(
+            (recipe.updated_at - timedelta(days=1)).timestamp()
+        )
+        res = self.client.get(
+            detail_url(recipe.id), HTTP_IF_MODIFIED_SINCE=earlier
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_detail_changed_by_update(self):
+        """test that updating a recipe changes its ETag"""
+        recipe = sample_recipe(self.user)
+        etag = self.client.get(detail_url(recipe.id))['ETag']
+        self.client.patch(detail_url(recipe.id), {'title': 'new title'})
+        res = self.client.get(detail_url(recipe.id), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], 'new title')
+
+    def test_detail_changed_by_tag_rename(self):
+        """test that renaming an attached tag changes the recipe ETag"""
+        recipe = sample_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe.tags.add(tag)
+        etag = self.client.get(detail_url(recipe.id))['ETag']
+        tag.name = 'Vegetarian'
+        tag.save()
+        res = self.client.get(detail_url(recipe.id), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'][0]['name'], 'Vegetarian')
+
+    def test_detail_other_user_not_found(self):
+        """test that other users' recipes are still not found"""
+        other = get_user_model().objects.create_user(
+            email="other@gmail.com",
+            password="test123"
+        )
+        recipe = sample_recipe(other)
+        res = self.client.get(detail_url(recipe.id))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_not_modified_until_delete(self):
+        """test the list ETag holds until a recipe is deleted"""
+        sample_recipe(self.user)
+        recipe = sample_recipe(self.user)
+        etag = self.client.get(RECIPES_URL)['ETag']
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        recipe.delete()
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_list_ignores_if_modified_since(self):
+        """test a delete is not hidden by If-Modified-Since on the list"""
+        recipe = sample_recipe(self.user)
+        sample_recipe(self.user)
+        res = self.client.get(RECIPES_URL)
+        self.assertNotIn('Last-Modified', res)
+
+        later = http_date((recipe.updated_at + timedelta(days=1)).timestamp())
+        recipe.delete()
+        res = self.client.get(RECIPES_URL, HTTP_IF_MODIFIED_SINCE=later)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
@@ -0,0 +1,78 @@
+import json
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from recipe.tests.utils import AuthenticatedApiTestCase, related_recipe
+
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+class PublicExportApiTests(TestCase):
+    """test unauthenticated export API"""
+
+    def test_auth_required(self):
+        """test that authentication is required"""
+        res = APIClient().get(EXPORT_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateExportApiTests(AuthenticatedApiTestCase):
+    """test streaming export of the authenticated user's recipes"""
+    email = 'export@gmail.com'
+
+    def test_export_json(self):
+        """test exporting recipes as a JSON array"""
+        recipes = [related_recipe(self.user, str(i)) for i in range(3)]
+        other = get_user_model().objects.create_user(
+            email="other@gmail.com",
+            password="test123"
+        )
+        related_recipe(other)
+        res = self.client.get(EXPORT_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Type'], 'application/json')
+        data = json.loads(b''.join(res.streaming_content))
+        self.assertEqual(
+            [item['id'] for item in data],
+            [r.id for r in reversed(recipes)]
+        )
+        self.assertEqual(data[0]['tags'][0]['name'], '2 tag')
+        self.assertEqual(data[0]['price'], '5.00')
+
+    def test_export_ndjson(self):
+        """test exporting recipes as newline delimited JSON"""
+        related_recipe(self.user, 'first')
+        related_recipe(self.user, 'second')
+        res = self.client.get(EXPORT_URL, {'output': 'ndjson'})
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        titles = [json.loads(line)['title'] for line in lines]
+        self.assertEqual(titles, ['second', 'first'])
+
+    def test_export_empty(self):
+        """test exporting with no recipes returns an empty array"""
+        res = self.client.get(EXPORT_URL)
+        self.assertEqual(json.loads(b''.join(res.streaming_content)), [])
+
+    @patch('recipe.export.EXPORT_CHUNK_SIZE', 2)
+    def test_export_queries_per_chunk(self):
+        """test related objects are prefetched once per chunk"""
+        for i in range(5):
+            related_recipe(self.user, str(i))
+        with self.assertNumQueries(1 + 3 * 2):
+            res = self.client.get(EXPORT_URL)
+            data = json.loads(b''.join(res.streaming_content))
+        self.assertEqual(len(data), 5)
+
+    def test_export_invalid_output(self):
+        """test that an unknown output format is rejected"""
+        res = self.client.get(EXPORT_URL, {'output': 'xml'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,413 @@
+import fcntl
+import io
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import MagicMock, patch
+
+from PIL import Image
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+
+from core.storage import BlockHash
+from recipe import images, uploads
+from recipe.images import VARIANTS, generate_variants, variant_name
+from recipe.tests.utils import AuthenticatedApiTestCase, sample_recipe
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def image_upload_url(recipe_id):
+    """return url for recipe image upload"""
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+def detail_url(recipe_id):
+    """return recipe url"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def sample_image(size=(2000, 1000), image_format='JPEG', mode='RGB'):
+    """return an open temporary image file"""
+    suffix = '.png' if image_format == 'PNG' else '.jpg'
+    ntf = tempfile.NamedTemporaryFile(suffix=suffix)
+    Image.new(mode, size).save(ntf, format=image_format)
+    ntf.seek(0)
+    return ntf
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, RECIPE_IMAGE_WORKERS=0)
+class RecipeImageUploadTests(AuthenticatedApiTestCase):
+    """test uploading recipe images and generating their variants"""
+    email = 'images@gmail.com'
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.recipe = sample_recipe(self.user)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def upload(self, ntf):
+        """upload ntf and run the variant jobs queued on commit"""
+        # TestCase never commits, so run on_commit callbacks immediately
+        with patch('recipe.images.transaction.on_commit', lambda f: f()):
+            return self.client.post(
+                image_upload_url(self.recipe.id), {'image': ntf},
+                format='multipart'
+            )
+
+    def test_upload_image_to_recipe(self):
+        """test uploading an image stores it and its variants"""
+        sizes = {'thumbnail': (320, 240), 'webp': (1280, 960)}
+        with sample_image((4000, 3000)) as ntf:
+            res = self.upload(ntf)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('image', res.data)
+        self.assertTrue(os.path.exists(self.recipe.image.path))
+        for variant, (_, image_format, _) in VARIANTS.items():
+            self.assertIsNotNone(res.data['image_variants'][variant])
+            path = os.path.join(
+                MEDIA_ROOT, variant_name(self.recipe.image.name, variant)
+            )
+            with Image.open(path) as image:
+                self.assertEqual(image.format, image_format)
+                self.assertEqual(image.size, sizes[variant])
+
+    def test_identical_images_share_storage(self):
+        """test uploading the same image twice stores it once"""
+        other = sample_recipe(self.user, title='other')
+        with sample_image() as ntf:
+            self.upload(ntf)
+            ntf.seek(0)
+            with patch('recipe.images.transaction.on_commit', lambda f: f()):
+                res = self.client.post(
+                    image_upload_url(other.id), {'image': ntf},
+                    format='multipart'
+                )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.recipe.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.recipe.image.name, other.image.name)
+        self.assertEqual(
+            len(os.listdir(os.path.dirname(self.recipe.image.path))), 2
+        )
+
+    def test_variants_regenerated_after_concurrent_release(self):
+        """test variants deleted before a reusing upload commits return"""
+        other = sample_recipe(self.user, title='other')
+        callbacks = []
+        with sample_image() as ntf:
+            self.upload(ntf)
+            ntf.seek(0)
+            with patch('recipe.images.transaction.on_commit',
+                       callbacks.append):
+                self.client.post(
+                    image_upload_url(other.id), {'image': ntf},
+                    format='multipart'
+                )
+        self.recipe.refresh_from_db()
+        name = self.recipe.image.name
+        for variant in VARIANTS:
+            os.remove(os.path.join(MEDIA_ROOT, variant_name(name, variant)))
+        os.remove(os.path.join(MEDIA_ROOT, name))
+
+        for callback in callbacks:
+            callback()
+        self.assertTrue(os.path.exists(os.path.join(MEDIA_ROOT, name)))
+        for variant in VARIANTS:
+            self.assertTrue(os.path.exists(
+                os.path.join(MEDIA_ROOT, variant_name(name, variant))
+            ))
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=0)
+    def test_large_upload_hashed_as_received(self):
+        """test uploads on disk are named without reading them again"""
+        with sample_image() as ntf, \
+                patch('core.storage.BlockHash.resume') as resume:
+            res = self.upload(ntf)
+            ntf.seek(0)
+            hasher = BlockHash()
+            hasher.update(ntf.read())
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        resume.assert_not_called()
+        self.recipe.refresh_from_db()
+        self.assertEqual(
+            os.path.basename(self.recipe.image.name),
+            f'{hasher.hexdigest()}.jpg'
+        )
+
+    def test_image_deleted_when_unreferenced(self):
+        """test shared images are only deleted with their last recipe"""
+        other = sample_recipe(self.user, title='other')
+        with sample_image() as ntf:
+            self.upload(ntf)
+        self.recipe.refresh_from_db()
+        name = self.recipe.image.name
+        other.image.name = name
+        other.save()
+        thumbnail = os.path.join(
+            MEDIA_ROOT, variant_name(name, 'thumbnail')
+        )
+
+        with patch('recipe.images.transaction.on_commit', lambda f: f()):
+            self.recipe.delete()
+            self.assertTrue(os.path.exists(os.path.join(MEDIA_ROOT, name)))
+            other.delete()
+        self.assertFalse(os.path.exists(os.path.join(MEDIA_ROOT, name)))
+        self.assertFalse(os.path.exists(thumbnail))
+
+    def test_replaced_image_deleted(self):
+        """test uploading a new image deletes the unreferenced old one"""
+        with sample_image() as ntf:
+            self.upload(ntf)
+        self.recipe.refresh_from_db()
+        old = self.recipe.image.path
+        with sample_image((300, 300)) as ntf:
+            self.upload(ntf)
+        self.recipe.refresh_from_db()
+        self.assertNotEqual(self.recipe.image.path, old)
+        self.assertFalse(os.path.exists(old))
+
+    def test_upload_image_bad_request(self):
+        """test uploading something that is not an image"""
+        res = self.client.post(
+            image_upload_url(self.recipe.id), {'image': 'notimage'},
+            format='multipart'
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_variants_pending_until_generated(self):
+        """test variant urls are None while the job has not run"""
+        with sample_image() as ntf:
+            res = self.client.post(
+                image_upload_url(self.recipe.id), {'image': ntf},
+                format='multipart'
+            )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data['image_variants'], {variant: None for variant in VARIANTS}
+        )
+
+    def test_detail_includes_variants(self):
+        """test the recipe detail exposes the generated variants"""
+        with sample_image() as ntf:
+            self.upload(ntf)
+        res = self.client.get(detail_url(self.recipe.id))
+        self.assertTrue(res.data['image'])
+        self.assertTrue(res.data['image_variants']['thumbnail'])
+
+    def test_generate_variants_converts_mode(self):
+        """test images with a palette are converted for jpeg output"""
+        with sample_image((50, 50), 'PNG', 'P') as ntf:
+            out = os.path.join(MEDIA_ROOT, 'test', 'thumb.jpg')
+            generate_variants(ntf.name, [('thumbnail', out)])
+        with Image.open(out) as image:
+            self.assertEqual(image.mode, 'RGB')
+            self.assertEqual(image.size, (50, 50))
+
+
+class VariantPoolTests(TestCase):
+    """test failures of the image variant process pool"""
+
+    def tearDown(self) -> None:
+        images._executor = None
+
+    @patch('concurrent.futures.ProcessPoolExecutor')
+    def test_broken_pool_restarted(self, pool):
+        """test a pool whose worker died is replaced on submit"""
+        broken = MagicMock()
+        broken.submit.side_effect = BrokenProcessPool()
+        images._executor = broken
+        future = Future()
+        pool.return_value.submit.return_value = future
+        self.assertIs(images.submit_variants('a.png', []), future)
+        self.assertIs(images._executor, pool.return_value)
+
+    def test_failure_logged(self):
+        """test a failed job is logged and a broken pool forgotten"""
+        executor = images._executor = MagicMock()
+        future = Future()
+        future.set_exception(BrokenProcessPool('worker died'))
+        with self.assertLogs('recipe.images', 'ERROR') as logs:
+            images.log_variants_failure(executor, 'a.png', future)
+        self.assertIn('a.png', logs.output[0])
+        self.assertIsNone(images._executor)
+
+
+def resumable_url(recipe_id):
+    """return url for chunked recipe image upload"""
+    return reverse('recipe:recipe-resumable-upload', args=[recipe_id])
+
+
+def image_bytes(size=(600, 400), image_format='PNG'):
+    """return the encoded bytes of a noisy image"""
+    buffer = io.BytesIO()
+    Image.effect_noise(size, 64).convert('RGB').save(buffer, image_format)
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, RECIPE_IMAGE_WORKERS=0)
+class ResumableUploadTests(AuthenticatedApiTestCase):
+    """test chunked, resumable recipe image uploads"""
+    email = 'chunks@gmail.com'
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.recipe = sample_recipe(self.user)
+        self.url = resumable_url(self.recipe.id)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def put_chunk(self, data, start, total):
+        """send data as the chunk starting at start"""
+        end = start + len(data) - 1
+        with patch('recipe.images.transaction.on_commit', lambda f: f()):
+            return self.client.put(
+                self.url, data, content_type='application/octet-stream',
+                HTTP_CONTENT_RANGE=f'bytes {start}-{end}/{total}'
+            )
+
+    def test_upload_in_chunks(self):
+        """test an image sent in chunks is assembled and stored"""
+        data = image_bytes()
+        half = len(data) // 2
+        res = self.put_chunk(data[:half], 0, len(data))
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data['offset'], half)
+
+        res = self.client.get(self.url)
+        self.assertEqual(res.data['offset'], half)
+
+        res = self.put_chunk(data[half:], half, len(data))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.data['image_variants']['thumbnail'])
+        self.recipe.refresh_from_db()
+        self.assertTrue(self.recipe.image.name.endswith('.png'))
+        with open(self.recipe.image.path, 'rb') as stored:
+            self.assertEqual(stored.read(), data)
+        self.assertEqual(self.client.get(self.url).data['offset'], 0)
+
+    @patch('core.storage.BLOCK_SIZE', 1000)
+    def test_chunks_hashed_as_written(self):
+        """test chunks across block boundaries name the image correctly"""
+        data = image_bytes((100, 100))
+        cuts = [0, 1500, 1501, 3999, len(data)]
+        for start, end in zip(cuts, cuts[1:]):
+            res = self.put_chunk(data[start:end], start, len(data))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        hasher = BlockHash()
+        hasher.update(data)
+        self.recipe.refresh_from_db()
+        self.assertEqual(
+            os.path.basename(self.recipe.image.name),
+            f'{hasher.hexdigest()}.png'
+        )
+        self.assertEqual(
+            os.listdir(os.path.join(MEDIA_ROOT, 'uploads/recipe/partial')),
+            []
+        )
+
+    def test_upload_changes_detail_etag(self):
+        """test a finished upload invalidates the cached recipe detail"""
+        detail = reverse('recipe:recipe-detail', args=[self.recipe.id])
+        etag = self.client.get(detail)['ETag']
+
+        data = image_bytes()
+        res = self.put_chunk(data, 0, len(data))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.client.get(detail, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.data['image'])
+
+    def test_resume_at_wrong_offset(self):
+        """test a chunk not starting at the current offset is refused"""
+        data = image_bytes()
+        self.put_chunk(data[:1000], 0, len(data))
+        res = self.put_chunk(data[2000:3000], 2000, len(data))
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(res.data['offset'], 1000)
+
+    def test_concurrent_chunk_rechecks_offset(self):
+        """test a chunk waiting for the upload lock sees the new offset"""
+        data = image_bytes()
+        self.put_chunk(data[:1000], 0, len(data))
+        path = os.path.join(MEDIA_ROOT, uploads.partial_name(self.recipe))
+        errors = []
+
+        def write():
+            try:
+                uploads.write_chunk(
+                    self.recipe, io.BytesIO(data[1000:2000]),
+                    1000, 1999, len(data)
+                )
+            except uploads.UploadOffsetMismatch as error:
+                errors.append(error)
+
+        with open(path, 'ab') as part:
+            fcntl.flock(part, fcntl.LOCK_EX)
+            writer = threading.Thread(target=write)
+            writer.start()
+            writer.join(0.2)
+            self.assertTrue(writer.is_alive())
+            part.write(data[1000:1500])
+        writer.join()
+        self.assertEqual([error.offset for error in errors], [1500])
+        with open(path, 'rb') as part:
+            self.assertEqual(part.read(), data[:1500])
+
+    def test_not_an_image_rejected_on_first_chunk(self):
+        """test the first chunk must start with a valid image header"""
+        res = self.put_chunk(b'not an image' * 100, 0, 10000)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url).data['offset'], 0)
+
+    @override_settings(RECIPE_IMAGE_MAX_BYTES=1000)
+    def test_total_size_limited(self):
+        """test uploads declaring a size over the limit are refused"""
+        data = image_bytes()
+        res = self.put_chunk(data[:500], 0, len(data))
+        self.assertEqual(
+            res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+
+    @override_settings(RECIPE_IMAGE_MAX_PIXELS=1000)
+    def test_dimensions_limited_from_header(self):
+        """test image dimensions are checked before the body arrives"""
+        data = image_bytes()
+        res = self.put_chunk(data[:100], 0, len(data))
+        self.assertEqual(
+            res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+
+    def test_invalid_content_range(self):
+        """test chunks need a well formed Content-Range header"""
+        res = self.client.put(
+            self.url, b'data', content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE='bytes 10-5/100'
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(RECIPE_IMAGE_MAX_PIXELS=1000)
+    def test_multipart_upload_limited(self):
+        """test the single request upload enforces the same limits"""
+        with sample_image() as ntf:
+            res = self.client.post(
+                image_upload_url(self.recipe.id), {'image': ntf},
+                format='multipart'
+            )
+        self.assertEqual(
+            res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
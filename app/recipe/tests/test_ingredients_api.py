@@ -8,6 +8,7 @@ from rest_framework.test import APIClient
 from core.models import Ingredient
 
 from recipe.serializers import IngredientSerializer
+from recipe.tests.utils import AuthenticatedApiTestCase, sample_recipe
 
 
 INGREDIENTS_URL = reverse('recipe:ingredient-list')
@@ -25,16 +26,9 @@ class PublicIngredientsAPI(TestCase):
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
-class PrivateIngredientsAPI(TestCase):
+class PrivateIngredientsAPI(AuthenticatedApiTestCase):
     """test ingredients can be retrieved by authorised user"""
-
-    def setUp(self) -> None:
-        self.client = APIClient()
-        self.user = get_user_model().objects.create_user(
-            email="pprasha2@hfb.com",
-            password="test123"
-        )
-        self.client.force_authenticate(self.user)
+    email = 'pprasha2@hfb.com'
 
     def test_retrieve_ingredient_list(self):
         """test retrieving ingredient list"""
@@ -44,7 +38,7 @@ class PrivateIngredientsAPI(TestCase):
         ingredients = Ingredient.objects.all().order_by('-name')
         serializer = IngredientSerializer(ingredients, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_ingredients_limited_to_user(self):
         """test that ingredients for the authenticated user are returned"""
@@ -56,8 +50,8 @@ class PrivateIngredientsAPI(TestCase):
         ingredient = Ingredient.objects.create(user=self.user, name='Turmeric')
         res = self.client.get(INGREDIENTS_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], ingredient.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], ingredient.name)
 
     def test_create_ingredient_successful(self):
         """test create an ingredient object"""
@@ -78,3 +72,21 @@ class PrivateIngredientsAPI(TestCase):
         }
         res = self.client.post(INGREDIENTS_URL, payload)
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_retrieve_ingredients_assigned_with_counts(self):
+        """test assigned only ingredients with their recipe counts"""
+        ingredient1 = Ingredient.objects.create(user=self.user, name='Apple')
+        Ingredient.objects.create(user=self.user, name='Turkey')
+        recipe = sample_recipe(self.user, title='Apple crumble')
+        recipe.ingredients.add(ingredient1)
+        res = self.client.get(
+            INGREDIENTS_URL, {'assigned_only': 1, 'with_counts': 1}
+        )
+        self.assertEqual(res.data['results'], [
+            {'id': ingredient1.id, 'name': 'Apple', 'recipe_count': 1}
+        ])
+
+    def test_retrieve_ingredients_invalid_flag(self):
+        """test that a non numeric flag is rejected"""
+        res = self.client.get(INGREDIENTS_URL, {'assigned_only': 'yes'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
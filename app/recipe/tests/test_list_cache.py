@@ -0,0 +1,102 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework import status
+
+from core.models import Tag, Ingredient
+from recipe.tests.utils import AuthenticatedApiTestCase, sample_recipe
+
+
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+TAGS_BULK_URL = reverse('recipe:tag-bulk')
+
+
+class ListCacheTests(AuthenticatedApiTestCase):
+    """test cached tag and ingredient lists"""
+    email = 'cache@gmail.com'
+
+    def test_cached_list_skips_database(self):
+        """test that a repeated list is served without queries"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        res = self.client.get(TAGS_URL)
+        with self.assertNumQueries(0):
+            cached = self.client.get(TAGS_URL)
+        self.assertEqual(cached.status_code, status.HTTP_200_OK)
+        self.assertEqual(cached.data, res.data)
+        self.assertEqual(cached['ETag'], res['ETag'])
+
+    def test_not_modified(self):
+        """test that a matching If-None-Match returns 304"""
+        Ingredient.objects.create(user=self.user, name='Salt')
+        res = self.client.get(INGREDIENTS_URL)
+        with self.assertNumQueries(0):
+            res = self.client.get(
+                INGREDIENTS_URL, HTTP_IF_NONE_MATCH=res['ETag']
+            )
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_invalidated_on_create(self):
+        """test that creating a tag invalidates the cached list"""
+        res = self.client.get(TAGS_URL)
+        self.client.post(TAGS_URL, {'name': 'Dessert'})
+        new = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(new.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(new.data['results']), 1)
+
+    def test_invalidated_on_update_and_delete(self):
+        """test that renaming or deleting a tag invalidates the list"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(TAGS_URL)
+        tag.name = 'Vegetarian'
+        tag.save()
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(res.data['results'][0]['name'], 'Vegetarian')
+        tag.delete()
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(res.data['results'], [])
+
+    def test_invalidated_on_recipe_change(self):
+        """test that recipe changes invalidate the user's lists"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        res = self.client.get(TAGS_URL)
+        recipe = sample_recipe(self.user, title='Salad')
+        etag = self.client.get(TAGS_URL)['ETag']
+        self.assertNotEqual(etag, res['ETag'])
+        recipe.tags.add(tag)
+        self.assertNotEqual(self.client.get(TAGS_URL)['ETag'], etag)
+
+    def test_invalidated_on_bulk_create(self):
+        """test that bulk writes invalidate the cached list"""
+        self.client.get(TAGS_URL)
+        self.client.post(TAGS_BULK_URL, [{'name': 'Vegan'}], format='json')
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_cache_per_user(self):
+        """test that users never see each other's cached lists"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(TAGS_URL)
+        other = get_user_model().objects.create_user(
+            email="other@gmail.com",
+            password="test123"
+        )
+        self.client.force_authenticate(user=other)
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(res.data['results'], [])
+
+    def test_invalidated_again_on_commit(self):
+        """test lists cached before a bulk write commits are retired"""
+        callbacks = []
+        with patch('recipe.signals.transaction.on_commit', callbacks.append):
+            self.client.post(TAGS_BULK_URL, [{'name': 'Vegan'}], format='json')
+            # a concurrent read before the commit caches this version
+            stale = self.client.get(TAGS_URL)
+        self.assertTrue(callbacks)
+
+        for callback in callbacks:
+            callback()
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=stale['ETag'])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -0,0 +1,124 @@
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from recipe.tests.utils import AuthenticatedApiTestCase, sample_recipe
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+CONTENT = bytes(range(256)) * 40
+
+
+def media_url(name):
+    """return the url serving the media file stored at name"""
+    return reverse('media', args=[name])
+
+
+def content(res):
+    """return the body of a possibly streamed response"""
+    if res.streaming:
+        # the test client closes the response once it is consumed
+        return b''.join(res.streaming_content)
+    return res.content
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, MEDIA_ACCEL='')
+class MediaServingTests(AuthenticatedApiTestCase):
+    """test serving uploaded recipe images"""
+    email = 'media@gmail.com'
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.recipe = sample_recipe(self.user)
+        self.recipe.image.save('photo.jpg', ContentFile(CONTENT))
+        self.url = media_url(self.recipe.image.name)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def test_serve_owned_image(self):
+        """test owners receive their image with long lived cache headers"""
+        res = self.client.get(self.url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(content(res), CONTENT)
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertEqual(res['Accept-Ranges'], 'bytes')
+        self.assertIn('immutable', res['Cache-Control'])
+        self.assertIn('private', res['Cache-Control'])
+        self.assertTrue(res['ETag'])
+
+    def test_login_required(self):
+        """test anonymous users cannot fetch media"""
+        res = APIClient().get(self.url)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_other_users_image_not_found(self):
+        """test users cannot fetch images of recipes they do not own"""
+        other = get_user_model().objects.create_user(
+            email="other@gmail.com",
+            password="test123"
+        )
+        self.client.force_authenticate(user=other)
+        res = self.client.get(self.url)
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_path_outside_media_root(self):
+        """test paths escaping MEDIA_ROOT are not served"""
+        res = self.client.get(media_url('uploads/recipe/../../../etc/passwd'))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_range_request(self):
+        """test a byte range is served as partial content"""
+        res = self.client.get(self.url, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(res.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(content(res), CONTENT[100:200])
+        self.assertEqual(res['Content-Range'], f'bytes 100-199/{len(CONTENT)}')
+        self.assertEqual(res['Content-Length'], '100')
+
+        res = self.client.get(self.url, HTTP_RANGE='bytes=-10')
+        self.assertEqual(content(res), CONTENT[-10:])
+
+    def test_range_not_satisfiable(self):
+        """test ranges past the end of the file are refused"""
+        res = self.client.get(self.url, HTTP_RANGE=f'bytes={len(CONTENT)}-')
+        self.assertEqual(
+            res.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+        )
+
+    def test_stale_if_range_sends_whole_file(self):
+        """test a range is ignored when If-Range does not match"""
+        res = self.client.get(
+            self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"'
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(content(res), CONTENT)
+
+    def test_not_modified(self):
+        """test revalidating with the etag returns 304"""
+        etag = self.client.get(self.url)['ETag']
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    @override_settings(MEDIA_ACCEL='x-accel-redirect',
+                       MEDIA_ACCEL_PREFIX='/protected/')
+    def test_x_accel_redirect(self):
+        """test nginx is asked to send the file"""
+        res = self.client.get(self.url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res['X-Accel-Redirect'], f'/protected/{self.recipe.image.name}'
+        )
+        self.assertEqual(res.content, b'')
+
+    @override_settings(MEDIA_ACCEL='x-sendfile')
+    def test_x_sendfile(self):
+        """test the web server is asked to send the file"""
+        res = self.client.get(self.url)
+        self.assertEqual(res['X-Sendfile'], self.recipe.image.path)
@@ -0,0 +1,67 @@
+from unittest.mock import patch
+
+from django.urls import reverse
+
+from rest_framework import status
+
+from core.models import Tag
+from recipe.pagination import RecipeCursorPagination
+from recipe.tests.utils import AuthenticatedApiTestCase, sample_recipe
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class PaginationTests(AuthenticatedApiTestCase):
+    """test cursor pagination of recipe lists"""
+    email = 'pages@gmail.com'
+
+    def collect_pages(self, url, params):
+        """follow next links and return the ids from every page"""
+        ids = []
+        res = self.client.get(url, params)
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            ids.extend(item['id'] for item in res.data['results'])
+            if not res.data['next']:
+                return ids
+            res = self.client.get(res.data['next'])
+
+    def test_recipes_paginated_newest_first(self):
+        """test recipe pages are keyed on id and cover every recipe"""
+        recipes = [sample_recipe(self.user, str(i)) for i in range(5)]
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIsNone(res.data['previous'])
+
+        ids = self.collect_pages(RECIPES_URL, {'page_size': 2})
+        self.assertEqual(ids, [r.id for r in reversed(recipes)])
+
+    def test_pages_stable_under_inserts(self):
+        """test that new recipes do not shift a cursor already handed out"""
+        old = [sample_recipe(self.user, str(i)) for i in range(4)]
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+        sample_recipe(self.user, 'new')
+        res = self.client.get(res.data['next'])
+        self.assertEqual(
+            [item['id'] for item in res.data['results']],
+            [old[1].id, old[0].id]
+        )
+
+    def test_tags_paginated_by_name(self):
+        """test tags with duplicate names are all returned across pages"""
+        for name in ['Vegan', 'Dessert', 'Vegan', 'Curry', 'Vegan']:
+            Tag.objects.create(user=self.user, name=name)
+        ids = self.collect_pages(TAGS_URL, {'page_size': 2})
+        expected = Tag.objects.order_by('-name', '-id')
+        self.assertEqual(ids, [tag.id for tag in expected])
+
+    @patch.object(RecipeCursorPagination, 'max_page_size', 2)
+    def test_page_size_capped(self):
+        """test that page_size cannot exceed the configured maximum"""
+        for i in range(3):
+            sample_recipe(self.user, str(i))
+        res = self.client.get(RECIPES_URL, {'page_size': 10 ** 6})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 2)
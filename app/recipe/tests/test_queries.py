@@ -0,0 +1,46 @@
+from django.urls import reverse
+
+from rest_framework import status
+
+from core.models import Tag, Ingredient
+from recipe.tests.utils import AuthenticatedApiTestCase, related_recipe
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    """return recipe url"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class RecipeQueryCountTests(AuthenticatedApiTestCase):
+    """test that recipe endpoints issue a fixed number of queries"""
+    email = 'queries@gmail.com'
+
+    def test_list_queries_constant(self):
+        """test listing recipes does not query per recipe"""
+        related_recipe(self.user, title='first')
+        with self.assertNumQueries(4):
+            res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        for i in range(10):
+            related_recipe(self.user, title=f'recipe {i}')
+        with self.assertNumQueries(4):
+            res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_detail_queries_constant(self):
+        """test retrieving a recipe does not query per tag or ingredient"""
+        recipe = related_recipe(self.user)
+        for i in range(5):
+            recipe.tags.add(Tag.objects.create(user=self.user, name=str(i)))
+            recipe.ingredients.add(
+                Ingredient.objects.create(user=self.user, name=str(i))
+            )
+        with self.assertNumQueries(4):
+            res = self.client.get(detail_url(recipe.id))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['tags']), 6)
+        self.assertEqual(len(res.data['ingredients']), 6)
@@ -1,5 +1,7 @@
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
@@ -7,6 +9,7 @@ from rest_framework.test import APIClient
 
 from core.models import Recipe, Tag, Ingredient
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
+from recipe.tests.utils import AuthenticatedApiTestCase, sample_recipe
 
 
 RECIPES_URL = reverse('recipe:recipe-list')
@@ -33,20 +36,6 @@ def sample_ingredient(user, name='Cinnamon'):
     )
 
 
-def sample_recipe(user, **param):
-    """create and return a sample recipe"""
-    defaults = {
-        'title': 'sample recipe',
-        'time_minutes': 10,
-        'price': 5.00
-    }
-    defaults.update(param)
-    return Recipe.objects.create(
-        user=user,
-        **defaults
-    )
-
-
 class PublicRecipeApiTests(TestCase):
     """test unauthenticated rest API"""
 
@@ -59,16 +48,9 @@ class PublicRecipeApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
-class PrivateRecipeApiTests(TestCase):
+class PrivateRecipeApiTests(AuthenticatedApiTestCase):
     """test recipe can be retrieved from authenticated user"""
-
-    def setUp(self) -> None:
-        self.client = APIClient()
-        self.user = get_user_model().objects.create_user(
-            email="test@gmail.com",
-            password="test123"
-        )
-        self.client.force_authenticate(user=self.user)
+    email = 'test@gmail.com'
 
     def test_retreive_recipe(self):
         """test user is able to retrieve recipe"""
@@ -78,7 +60,7 @@ class PrivateRecipeApiTests(TestCase):
         recipes = Recipe.objects.all().order_by('-id')
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipes_limited_to_user(self):
         """test that recipes are limited to authenticated user"""
@@ -92,8 +74,8 @@ class PrivateRecipeApiTests(TestCase):
         recipes = Recipe.objects.filter(user=self.user)
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_view_recipe_detail(self):
         """test viewing recipe detail"""
@@ -194,3 +176,101 @@ class PrivateRecipeApiTests(TestCase):
         self.assertEqual(recipe.price, payload['price'])
         tags = recipe.tags.all()
         self.assertEqual(len(tags), 0)
+
+    def test_create_recipe_with_other_users_tag(self):
+        """test that tags of another user cannot be attached"""
+        user2 = get_user_model().objects.create_user(
+            email="qwerty@yopmail.com",
+            password='qwerty'
+        )
+        own_tag = sample_tag(user=self.user)
+        other_tag = sample_tag(user=user2)
+        payload = {
+            'title': 'Borrowed tags',
+            'tags': [own_tag.id, other_tag.id, other_tag.id + 100],
+            'time_minutes': 20,
+            'price': 10
+        }
+        res = self.client.post(RECIPES_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(res.data['tags']), 1)
+        self.assertIn(str(other_tag.id), res.data['tags'][0])
+        self.assertIn(str(other_tag.id + 100), res.data['tags'][0])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_create_recipe_with_invalid_tag_pk(self):
+        """test that non numeric tag ids are rejected"""
+        payload = {
+            'title': 'Bad tags',
+            'tags': ['abc'],
+            'time_minutes': 20,
+            'price': 10
+        }
+        res = self.client.post(RECIPES_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_create_recipe_tag_queries_constant(self):
+        """test that related ids are resolved in one query per field"""
+        def create(count):
+            tags = [sample_tag(user=self.user, name=str(i))
+                    for i in range(count)]
+            payload = {
+                'title': 'Many tags',
+                'tags': [tag.id for tag in tags],
+                'time_minutes': 20,
+                'price': 10
+            }
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.post(RECIPES_URL, payload)
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            return len(queries)
+
+        self.assertEqual(create(1), create(50))
+
+    def test_filter_recipes_by_tags(self):
+        """test returning recipes with any of the given tags"""
+        recipe1 = sample_recipe(user=self.user, title='Thai curry')
+        recipe2 = sample_recipe(user=self.user, title='Aubergine tahini')
+        recipe3 = sample_recipe(user=self.user, title='Fish and chips')
+        tag1 = sample_tag(user=self.user, name='Vegan')
+        tag2 = sample_tag(user=self.user, name='Vegetarian')
+        recipe1.tags.add(tag1)
+        recipe2.tags.add(tag1, tag2)
+        res = self.client.get(RECIPES_URL, {'tags': f'{tag1.id},{tag2.id}'})
+        ids = [item['id'] for item in res.data['results']]
+        self.assertEqual(ids, [recipe2.id, recipe1.id])
+        self.assertNotIn(recipe3.id, ids)
+
+    def test_filter_recipes_by_all_tags(self):
+        """test returning recipes with every one of the given tags"""
+        recipe1 = sample_recipe(user=self.user, title='Thai curry')
+        recipe2 = sample_recipe(user=self.user, title='Aubergine tahini')
+        tag1 = sample_tag(user=self.user, name='Vegan')
+        tag2 = sample_tag(user=self.user, name='Vegetarian')
+        recipe1.tags.add(tag1)
+        recipe2.tags.add(tag1, tag2)
+        res = self.client.get(
+            RECIPES_URL, {'tags': f'{tag1.id},{tag2.id}', 'match': 'all'}
+        )
+        ids = [item['id'] for item in res.data['results']]
+        self.assertEqual(ids, [recipe2.id])
+
+    def test_filter_recipes_by_tags_and_ingredients(self):
+        """test that tag and ingredient filters are combined"""
+        recipe1 = sample_recipe(user=self.user, title='Posh beans')
+        recipe2 = sample_recipe(user=self.user, title='Chicken cacciatore')
+        tag = sample_tag(user=self.user)
+        ingredient = sample_ingredient(user=self.user, name='Feta cheese')
+        recipe1.tags.add(tag)
+        recipe1.ingredients.add(ingredient)
+        recipe2.tags.add(tag)
+        res = self.client.get(
+            RECIPES_URL, {'tags': str(tag.id), 'ingredients': ingredient.id}
+        )
+        ids = [item['id'] for item in res.data['results']]
+        self.assertEqual(ids, [recipe1.id])
+
+    def test_filter_recipes_invalid_ids(self):
+        """test that malformed filter ids are rejected"""
+        res = self.client.get(RECIPES_URL, {'tags': '1,abc'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
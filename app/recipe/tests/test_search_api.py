@@ -0,0 +1,98 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework import status
+
+from core.models import Tag, Ingredient
+from recipe.tests.utils import AuthenticatedApiTestCase, sample_recipe
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class RecipeSearchApiTests(AuthenticatedApiTestCase):
+    """test searching recipes by title, ingredient and tag names"""
+    email = 'search@gmail.com'
+
+    def search(self, terms, **params):
+        """return the ids of the recipes matching terms"""
+        res = self.client.get(RECIPES_URL, {'search': terms, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [item['id'] for item in res.data['results']]
+
+    def test_search_title(self):
+        """test that recipes are found by title"""
+        recipe = sample_recipe(self.user, 'Thai curry')
+        sample_recipe(self.user, 'Fish and chips')
+        self.assertEqual(self.search('curry'), [recipe.id])
+
+    def test_search_related_names(self):
+        """test that recipes are found by ingredient and tag names"""
+        by_ingredient = sample_recipe(self.user, 'Dal')
+        by_ingredient.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Lentils')
+        )
+        by_tag = sample_recipe(self.user, 'Soup')
+        tag = Tag.objects.create(user=self.user, name='Lentils')
+        by_tag.tags.add(tag)
+        sample_recipe(self.user, 'Toast')
+        self.assertEqual(
+            sorted(self.search('lentils')),
+            sorted([by_ingredient.id, by_tag.id])
+        )
+
+    def test_search_follows_renames(self):
+        """test that renaming a tag updates the matching recipes"""
+        recipe = sample_recipe(self.user, 'Soup')
+        tag = Tag.objects.create(user=self.user, name='Winter')
+        recipe.tags.add(tag)
+        tag.name = 'Summer'
+        tag.save()
+        self.assertEqual(self.search('summer'), [recipe.id])
+        self.assertEqual(self.search('winter'), [])
+        tag.delete()
+        self.assertEqual(self.search('summer'), [])
+
+    def test_search_ranks_title_first(self):
+        """test that title matches rank above ingredient matches"""
+        by_ingredient = sample_recipe(self.user, 'Green salad')
+        by_ingredient.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Avocado')
+        )
+        by_title = sample_recipe(self.user, 'Avocado toast')
+        self.assertEqual(
+            self.search('avocado'), [by_title.id, by_ingredient.id]
+        )
+
+    def test_search_paginated(self):
+        """test that search results are paged by relevance"""
+        recipes = [sample_recipe(self.user, f'Curry {i}') for i in range(3)]
+        res = self.client.get(RECIPES_URL, {'search': 'curry', 'page_size': 2})
+        ids = [item['id'] for item in res.data['results']]
+        res = self.client.get(res.data['next'])
+        ids += [item['id'] for item in res.data['results']]
+        self.assertEqual(ids, [r.id for r in reversed(recipes)])
+
+    def test_search_pages_distinct_ranks(self):
+        """test that paging by rank neither skips nor repeats recipes"""
+        recipes = [
+            sample_recipe(self.user, ' '.join(['curry'] * i + ['rice'] * 3))
+            for i in range(1, 5)
+        ]
+        ids, params = [], {'search': 'curry', 'page_size': 1}
+        res = self.client.get(RECIPES_URL, params)
+        for _ in recipes:
+            ids += [item['id'] for item in res.data['results']]
+            if not res.data['next']:
+                break
+            res = self.client.get(res.data['next'])
+        self.assertCountEqual(ids, [r.id for r in recipes])
+
+    def test_search_limited_to_user(self):
+        """test that other users' recipes are not searched"""
+        other = get_user_model().objects.create_user(
+            email="other@gmail.com",
+            password="test123"
+        )
+        sample_recipe(other, 'Thai curry')
+        self.assertEqual(self.search('curry'), [])
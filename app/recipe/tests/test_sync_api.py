@@ -0,0 +1,142 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient
+from recipe.tests.utils import AuthenticatedApiTestCase, sample_recipe
+
+
+SYNC_URL = reverse('recipe:sync')
+TAGS_BULK_URL = reverse('recipe:tag-bulk')
+
+
+class PublicSyncApiTests(TestCase):
+    """test unauthenticated sync API"""
+
+    def test_auth_required(self):
+        """test that authentication is required"""
+        res = APIClient().get(SYNC_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateSyncApiTests(AuthenticatedApiTestCase):
+    """test the changes since feed"""
+    email = 'sync@gmail.com'
+
+    def sync(self, since=0, **params):
+        """return the sync payload after since"""
+        res = self.client.get(SYNC_URL, {'since': since, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_initial_sync(self):
+        """test that a first sync returns every object"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ingredient = Ingredient.objects.create(user=self.user, name='Kale')
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(tag)
+        data = self.sync()
+        self.assertEqual(
+            [item['id'] for item in data['recipes']['updated']], [recipe.id]
+        )
+        self.assertEqual(data['recipes']['updated'][0]['tags'], [tag.id])
+        self.assertEqual(data['tags']['updated'][0]['name'], 'Vegan')
+        self.assertEqual(data['ingredients']['updated'][0]['id'],
+                         ingredient.id)
+        self.assertFalse(data['has_more'])
+
+    def test_only_changes_after_watermark(self):
+        """test that a later sync returns only what changed since"""
+        unchanged = Tag.objects.create(user=self.user, name='Vegan')
+        changed = Tag.objects.create(user=self.user, name='Curry')
+        recipe = sample_recipe(self.user)
+        watermark = self.sync()['watermark']
+        changed.name = 'Thai curry'
+        changed.save()
+        recipe_id = recipe.id
+        recipe.delete()
+        data = self.sync(watermark)
+        self.assertEqual(
+            [item['id'] for item in data['tags']['updated']], [changed.id]
+        )
+        self.assertNotEqual(data['tags']['updated'][0]['id'], unchanged.id)
+        self.assertEqual(data['recipes'], {
+            'updated': [], 'deleted': [recipe_id]
+        })
+        self.assertEqual(self.sync(data['watermark'])['tags']['updated'], [])
+
+    def test_deleted_tag_updates_recipes(self):
+        """test that deleting a tag reports the recipes that used it"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(tag)
+        watermark = self.sync()['watermark']
+        tag_id = tag.id
+        tag.delete()
+        data = self.sync(watermark)
+        self.assertEqual(data['tags']['deleted'], [tag_id])
+        self.assertEqual(data['recipes']['updated'][0]['tags'], [])
+
+    def test_bulk_changes_logged(self):
+        """test that bulk created objects appear in the feed"""
+        watermark = self.sync()['watermark']
+        self.client.post(TAGS_BULK_URL, [{'name': 'a'}, {'name': 'b'}],
+                         format='json')
+        data = self.sync(watermark)
+        self.assertEqual(len(data['tags']['updated']), 2)
+
+    def test_limit_and_has_more(self):
+        """test that the feed is paged by log entries"""
+        tags = [Tag.objects.create(user=self.user, name=str(i))
+                for i in range(3)]
+        data = self.sync(limit=2)
+        self.assertTrue(data['has_more'])
+        self.assertEqual(len(data['tags']['updated']), 2)
+        data = self.sync(data['watermark'], limit=2)
+        self.assertFalse(data['has_more'])
+        self.assertEqual(data['tags']['updated'][0]['id'], tags[2].id)
+
+    def test_changes_limited_to_user(self):
+        """test that other users' changes are not returned"""
+        other = get_user_model().objects.create_user(
+            email="other@gmail.com",
+            password="test123"
+        )
+        Tag.objects.create(user=other, name='Theirs')
+        self.assertEqual(self.sync()['tags']['updated'], [])
+
+    def test_queries_independent_of_changes(self):
+        """test that the feed costs a fixed number of queries"""
+        for i in range(10):
+            sample_recipe(self.user, str(i)).tags.add(
+                Tag.objects.create(user=self.user, name=str(i))
+            )
+        with self.assertNumQueries(5):
+            self.sync()
+
+    def test_invalid_since(self):
+        """test that a non numeric watermark is rejected"""
+        res = self.client.get(SYNC_URL, {'since': 'yesterday'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('since', res.data)
+
+    def test_invalid_limit(self):
+        """test that a non numeric limit is reported as such"""
+        res = self.client.get(SYNC_URL, {'limit': 'all'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(list(res.data), ['limit'])
+
+    @skipUnless(connection.vendor == 'postgresql', 'needs postgres locks')
+    def test_log_entries_ordered_by_commit(self):
+        """test that logging holds the user's lock until commit"""
+        with CaptureQueriesContext(connection) as queries:
+            Tag.objects.create(user=self.user, name='Vegan')
+        self.assertTrue(any('pg_advisory_xact_lock' in query['sql']
+                            for query in queries))
@@ -5,6 +5,7 @@ from rest_framework import status
 from rest_framework.test import APIClient
 from core.models import Tag
 from recipe.serializers import TagSerializer
+from recipe.tests.utils import AuthenticatedApiTestCase, sample_recipe
 
 
 TAGS_URL = reverse('recipe:tag-list')
@@ -22,16 +23,9 @@ class PublicTagsApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
-class PrivateTagsApiTests(TestCase):
+class PrivateTagsApiTests(AuthenticatedApiTestCase):
     """test the authorized user tags API"""
-
-    def setUp(self) -> None:
-        self.user = get_user_model().objects.create_user(
-            email='pprds@will.com',
-            password="test1234"
-        )
-        self.client = APIClient()
-        self.client.force_authenticate(self.user)
+    email = 'pprds@will.com'
 
     def test_retrieve_tags(self):
         """test retrieving tags"""
@@ -41,7 +35,7 @@ class PrivateTagsApiTests(TestCase):
         tags = Tag.objects.all().order_by('-name')
         serializer = TagSerializer(tags, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_tags_limited_to_user(self):
         """test that tags returned are for the authenticated user"""
@@ -53,8 +47,8 @@ class PrivateTagsApiTests(TestCase):
         tag = Tag.objects.create(user=self.user, name='North Indian')
         res = self.client.get(TAGS_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], tag.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], tag.name)
 
     def test_create_tag_successful(self):
         """test create a tag"""
@@ -75,3 +69,37 @@ class PrivateTagsApiTests(TestCase):
         }
         res = self.client.post(TAGS_URL, payload)
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_retrieve_tags_assigned_to_recipes(self):
+        """test filtering tags by those assigned to recipes"""
+        tag1 = Tag.objects.create(user=self.user, name='Breakfast')
+        tag2 = Tag.objects.create(user=self.user, name='Lunch')
+        recipe = sample_recipe(self.user, title='Coriander eggs on toast')
+        recipe.tags.add(tag1)
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+        names = [item['name'] for item in res.data['results']]
+        self.assertIn(tag1.name, names)
+        self.assertNotIn(tag2.name, names)
+
+    def test_retrieve_tags_assigned_unique(self):
+        """test filtering tags by assigned returns unique items"""
+        tag = Tag.objects.create(user=self.user, name='Breakfast')
+        Tag.objects.create(user=self.user, name='Lunch')
+        for title in ('Pancakes', 'Porridge'):
+            recipe = sample_recipe(self.user, title=title)
+            recipe.tags.add(tag)
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_retrieve_tags_with_counts(self):
+        """test annotating tags with the number of recipes using them"""
+        tag1 = Tag.objects.create(user=self.user, name='Breakfast')
+        Tag.objects.create(user=self.user, name='Lunch')
+        for title in ('Pancakes', 'Porridge'):
+            recipe = sample_recipe(self.user, title=title)
+            recipe.tags.add(tag1)
+        with self.assertNumQueries(1):
+            res = self.client.get(TAGS_URL, {'with_counts': 1})
+        counts = {item['name']: item['recipe_count']
+                  for item in res.data['results']}
+        self.assertEqual(counts, {'Breakfast': 2, 'Lunch': 0})
@@ -0,0 +1,39 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+
+def sample_recipe(user, title='sample recipe', **params):
+    """create and return a sample recipe"""
+    defaults = {
+        'time_minutes': 10,
+        'price': 5.00
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, title=title, **defaults)
+
+
+def related_recipe(user, title='sample recipe'):
+    """create a sample recipe with a tag and an ingredient attached"""
+    recipe = sample_recipe(user, title)
+    recipe.tags.add(Tag.objects.create(user=user, name=f'{title} tag'))
+    recipe.ingredients.add(
+        Ingredient.objects.create(user=user, name=f'{title} ingredient')
+    )
+    return recipe
+
+
+class AuthenticatedApiTestCase(TestCase):
+    """test case with a client authenticated as a new user of email"""
+    email = 'test@gmail.com'
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email=self.email,
+            password="test123"
+        )
+        self.client.force_authenticate(user=self.user)
@@ -0,0 +1,186 @@
+import fcntl
+import io
+import os
+import re
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from core.models import recipe_image_file_path
+from core.storage import BlockHash
+from recipe.images import release_image
+
+
+READ_SIZE = 64 * 1024
+# enough of the file for Pillow to find the header behind large EXIF blocks
+HEADER_SIZE = 256 * 1024
+IMAGE_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp', 'GIF': 'gif'}
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+class PartialFile(File):
+    """a finished upload on disk, which storage can move instead of copy"""
+
+    def temporary_file_path(self):
+        return self.name
+
+
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Image is too large.'
+    default_code = 'too_large'
+
+
+class UploadOffsetMismatch(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Chunk does not start at the current offset.'
+    default_code = 'offset_mismatch'
+
+    def __init__(self, offset):
+        super().__init__()
+        self.offset = offset
+
+
+def parse_content_range(header):
+    """return (start, end, total) from a Content-Range request header"""
+    match = CONTENT_RANGE_RE.match(header or '')
+    if not match:
+        raise ValidationError({'Content-Range': [
+            'Expected bytes <start>-<end>/<total>.'
+        ]})
+    start, end, total = map(int, match.groups())
+    if start > end or end >= total:
+        raise ValidationError({'Content-Range': ['Invalid byte range.']})
+    return start, end, total
+
+
+def check_image_limits(size=None, width=None, height=None):
+    """raise if an image exceeds the configured byte or pixel limits"""
+    if size is not None and size > settings.RECIPE_IMAGE_MAX_BYTES:
+        raise UploadTooLarge(
+            f'Image exceeds {settings.RECIPE_IMAGE_MAX_BYTES} bytes.'
+        )
+    if width is not None and \
+            width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+        raise UploadTooLarge(
+            f'Image exceeds {settings.RECIPE_IMAGE_MAX_PIXELS} pixels.'
+        )
+
+
+def check_image_header(data):
+    """validate the start of an image without decoding it, return format"""
+    from PIL import Image
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image_format, (width, height) = image.format, image.size
+    except (OSError, SyntaxError, ValueError):
+        image_format = None
+    if image_format not in IMAGE_FORMATS:
+        raise ValidationError({'image': ['Upload a valid image.']})
+    check_image_limits(width=width, height=height)
+    return image_format
+
+
+def partial_name(recipe):
+    """return the storage name of the unfinished upload for recipe"""
+    return os.path.join('uploads/recipe/partial/', f'{recipe.id}.part')
+
+
+def read_digests(path):
+    """return the block digests saved next to a partial upload"""
+    try:
+        with open(path, 'rb') as blocks:
+            return blocks.read()
+    except FileNotFoundError:
+        return b''
+
+
+def upload_offset(recipe):
+    """return the number of bytes received so far for recipe"""
+    try:
+        return os.path.getsize(default_storage.path(partial_name(recipe)))
+    except FileNotFoundError:
+        return 0
+
+
+def read(stream, size):
+    """read up to size bytes, fewer only when the stream ends"""
+    parts = []
+    while size > 0:
+        data = stream.read(min(size, READ_SIZE))
+        if not data:
+            break
+        parts.append(data)
+        size -= len(data)
+    return b''.join(parts)
+
+
+def write_chunk(recipe, stream, start, end, total):
+    """append bytes start to end of an upload, return the new offset
+
+    A chunk starting at 0 restarts the upload, any other chunk must
+    start where the previous one stopped. The digests of the complete
+    blocks are kept next to the upload so it is hashed as it is written.
+    Requests for the same upload are serialized by a lock on its file.
+    """
+    check_image_limits(size=total)
+    remaining = end - start + 1
+    head = b''
+    if start == 0:
+        head = read(stream, min(remaining, HEADER_SIZE))
+        check_image_header(head)
+        remaining -= len(head)
+
+    path = default_storage.path(partial_name(recipe))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'ab') as part:
+        fcntl.flock(part, fcntl.LOCK_EX)
+        # another chunk may have been written while waiting for the lock
+        offset = os.fstat(part.fileno()).st_size
+        if start not in (0, offset):
+            raise UploadOffsetMismatch(offset)
+        if start == 0:
+            part.truncate(0)
+            if os.path.exists(f'{path}.blocks'):
+                os.remove(f'{path}.blocks')
+            hasher = BlockHash()
+        else:
+            hasher = BlockHash.resume(path, read_digests(f'{path}.blocks'))
+        part.write(head)
+        hasher.update(head)
+        while remaining > 0:
+            data = stream.read(min(remaining, READ_SIZE))
+            if not data:
+                break
+            part.write(data)
+            hasher.update(data)
+            remaining -= len(data)
+        offset = part.tell()
+        with open(f'{path}.blocks', 'wb') as blocks:
+            blocks.write(hasher.digests)
+    return offset
+
+
+def finish_upload(recipe):
+    """move a complete upload into place as the recipe image"""
+    previous = recipe.image.name
+    path = default_storage.path(partial_name(recipe))
+    digests = read_digests(f'{path}.blocks')
+    with transaction.atomic(), PartialFile(open(path, 'rb')) as part:
+        image_format = check_image_header(part.read(HEADER_SIZE))
+        part.content_hash = BlockHash.resume(path, digests).hexdigest()
+        name = default_storage.save(recipe_image_file_path(
+            recipe, f'image.{IMAGE_FORMATS[image_format]}'
+        ), part)
+        recipe.image.name = name
+        recipe.save(update_fields=['image', 'updated_at'])
+    os.remove(f'{path}.blocks')
+    if previous != name:
+        release_image(previous)
+    return name
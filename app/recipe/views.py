@@ -1,20 +1,175 @@
-from rest_framework import viewsets, mixins
-from rest_framework.authentication import TokenAuthentication
+import hashlib
+import io
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch, Count, Max, Exists, OuterRef, \
+    Subquery
+from django.db.models.functions import Coalesce
+from django.core.cache import cache
+from django.http import Http404, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers, get_conditional_response
+from django.utils.http import parse_etags, http_date
+from rest_framework import viewsets, mixins, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
-from core.models import Tag, Ingredient, Recipe
-from recipe import serializers
+from core.authentication import CachedTokenAuthentication
+from core.db.routers import primary_reads
+from core.models import Tag, Ingredient, Recipe, ChangeLog
+from core.media import serve_media
+from core.search import search_recipes
+from recipe import serializers, uploads
+from recipe.autocomplete import get_index
+from recipe.images import image_owned, release_image, schedule_variants
+from recipe.cache import list_cache_key, list_cache_timeout
+from recipe.export import stream_json, stream_ndjson
+from recipe.pagination import RecipeCursorPagination, \
+    RecipeAttrCursorPagination, RecipeSearchPagination
+
+
+class BulkModelMixin:
+    """create, update and delete lists of objects in one request"""
+
+    @staticmethod
+    def check_bulk_size(data):
+        """reject bulk payloads longer than API_MAX_BULK_SIZE"""
+        max_size = getattr(settings, 'API_MAX_BULK_SIZE', 1000)
+        if isinstance(data, list) and len(data) > max_size:
+            raise ValidationError({'non_field_errors': [
+                f'Ensure this list has at most {max_size} items.'
+            ]})
+
+    def get_bulk_objects(self, data, key=None):
+        """return the objects referenced by a bulk payload, in order"""
+        if not isinstance(data, list) or not data:
+            raise ValidationError({'non_field_errors': ['Expected a list.']})
+        self.check_bulk_size(data)
+        ids = data
+        if key:
+            ids = [item.get(key) if isinstance(item, dict) else None
+                   for item in data]
+        if not all(isinstance(pk, int) and not isinstance(pk, bool)
+                   for pk in ids):
+            raise ValidationError({'id': ['Expected a list of ids.']})
+        if len(set(ids)) != len(ids):
+            raise ValidationError({'id': ['Duplicate ids.']})
+        found = self.get_queryset().in_bulk(ids)
+        missing = [pk for pk in ids if pk not in found]
+        if missing:
+            raise ValidationError({'id': [f'Invalid ids: {missing}.']})
+        return [found[pk] for pk in ids]
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """create a list of objects in a single transaction"""
+        self.check_bulk_size(request.data)
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            serializer.save(user=self.request.user)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @bulk.mapping.patch
+    def bulk_update(self, request):
+        """partially update a list of objects identified by id"""
+        instances = self.get_bulk_objects(request.data, key='id')
+        serializer = self.get_serializer(
+            instances, data=request.data, many=True, partial=True
+        )
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            serializer.save()
+        return Response(serializer.data)
+
+    @bulk.mapping.delete
+    def bulk_destroy(self, request):
+        """delete a list of objects given their ids"""
+        instances = self.get_bulk_objects(request.data)
+        self.get_queryset().filter(
+            id__in=[instance.id for instance in instances]
+        ).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class CachedListMixin:
+    """cache list responses per user until any of their data changes"""
 
+    def list(self, request, *args, **kwargs):
+        """return the cached list, or 304 if the client copy is current"""
+        key, etag = list_cache_key(request, self.basename)
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+        if etag in parse_etags(if_none_match) or if_none_match == '*':
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            data = cache.get(key)
+            if data is None:
+                with primary_reads():
+                    response = super().list(request, *args, **kwargs)
+                cache.set(key, response.data, list_cache_timeout())
+            else:
+                response = Response(data)
+        response['ETag'] = etag
+        patch_vary_headers(response, ('Authorization', ))
+        return response
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
+
+class BaseRecipeAttrViewSet(CachedListMixin,
+                            BulkModelMixin,
+                            viewsets.GenericViewSet,
                             mixins.ListModelMixin,
                             mixins.CreateModelMixin):
     """Base viewset for user owned recipe attributes"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = RecipeAttrCursorPagination
 
     def get_queryset(self):
         """Return objects for current authenticated user only"""
-        return self.queryset.filter(user=self.request.user).order_by('-name')
+        queryset = self.queryset.filter(user=self.request.user)
+        if self.action == 'list':
+            field = Recipe._meta.get_field(self.recipe_relation)
+            target = field.m2m_reverse_name()
+            rows = field.remote_field.through.objects.filter(**{
+                target: OuterRef('pk')
+            })
+            if self._flag('assigned_only'):
+                queryset = queryset.filter(Exists(rows))
+            if self._flag('with_counts'):
+                counts = rows.order_by().values(target).annotate(
+                    count=Count('pk')
+                ).values('count')
+                queryset = queryset.annotate(
+                    recipe_count=Coalesce(Subquery(counts), 0)
+                )
+        return queryset.order_by('-name', '-id')
+
+    def get_serializer_class(self):
+        """return the serializer including usage counts if requested"""
+        if self.action == 'list' and self._flag('with_counts'):
+            return self.usage_serializer_class
+        return self.serializer_class
+
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """return the names matching ?q=, at most ?limit= of them"""
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            raise ValidationError({'limit': ['Expected an integer.']})
+        limit = max(1, min(limit, 50))
+        index = get_index(self.queryset, request.user.id)
+        matches = index.search(request.query_params.get('q', ''), limit)
+        return Response([{'id': pk, 'name': name} for pk, name in matches])
+
+    def _flag(self, name):
+        """return a 0/1 query parameter as a boolean"""
+        try:
+            return bool(int(self.request.query_params.get(name, 0)))
+        except ValueError:
+            raise ValidationError({name: ['Expected 0 or 1.']})
 
     def perform_create(self, serializer):
         """create a new object"""
@@ -25,31 +180,299 @@ class TagViewSet(BaseRecipeAttrViewSet):
     """manage tags in the database"""
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    usage_serializer_class = serializers.TagUsageSerializer
+    recipe_relation = 'tags'
 
 
 class IngredientViewSet(BaseRecipeAttrViewSet):
     """manage ingredients in the database"""
     queryset = Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
+    usage_serializer_class = serializers.IngredientUsageSerializer
+    recipe_relation = 'ingredients'
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(BulkModelMixin, viewsets.ModelViewSet):
     """manage recipes in the database"""
     queryset = Recipe.objects.all()
     serializer_class = serializers.RecipeSerializer
-    authentication_classes = (TokenAuthentication, )
+    authentication_classes = (CachedTokenAuthentication, )
     permission_classes = (IsAuthenticated, )
+    pagination_class = RecipeCursorPagination
+    export_formats = {
+        'json': (stream_json, 'application/json'),
+        'ndjson': (stream_ndjson, 'application/x-ndjson'),
+    }
 
     def get_queryset(self):
         """Return objects for current authenticated user only"""
-        return self.queryset.filter(user=self.request.user).order_by('-id')
+        queryset = self.queryset.filter(user=self.request.user)
+        if self.action == 'list':
+            queryset = queryset.prefetch_related(
+                Prefetch('ingredients', Ingredient.objects.only('id')),
+                Prefetch('tags', Tag.objects.only('id')),
+            )
+        elif self.action == 'retrieve':
+            queryset = queryset.prefetch_related(
+                Prefetch('ingredients', Ingredient.objects.only('id', 'name')),
+                Prefetch('tags', Tag.objects.only('id', 'name')),
+            )
+        if self.action in ('list', 'retrieve', 'export'):
+            queryset = queryset.only(
+                'id', 'title', 'time_minutes', 'price', 'link', 'image'
+            )
+        if self.action in ('list', 'export'):
+            queryset = self.filter_related(queryset)
+            terms = self.request.query_params.get('search')
+            if terms:
+                queryset = search_recipes(queryset, terms)
+        return queryset.order_by('-id')
+
+    @property
+    def paginator(self):
+        """page search results by relevance instead of by id"""
+        request = getattr(self, 'request', None)
+        if request and request.query_params.get('search') and \
+                not hasattr(self, '_paginator'):
+            self._paginator = RecipeSearchPagination()
+        return super().paginator
+
+    def _params_to_ints(self, name):
+        """convert a comma separated id list parameter to integers"""
+        value = self.request.query_params.get(name)
+        if not value:
+            return []
+        try:
+            return [int(pk) for pk in value.split(',')]
+        except ValueError:
+            raise ValidationError({name: ['Expected comma separated ids.']})
+
+    def filter_related(self, queryset):
+        """filter by ?tags= and ?ingredients=, see ?match=any|all
+
+        Both filters are subqueries on the through tables, so the recipe
+        rows are never joined and multiplied and no DISTINCT is needed.
+        """
+        match = self.request.query_params.get('match', 'any')
+        if match not in ('any', 'all'):
+            raise ValidationError({'match': ['Expected any or all.']})
+        for name in ('tags', 'ingredients'):
+            ids = set(self._params_to_ints(name))
+            if not ids:
+                continue
+            field = Recipe._meta.get_field(name)
+            source = field.m2m_column_name()
+            target = field.m2m_reverse_name()
+            rows = field.remote_field.through.objects.filter(**{
+                f'{target}__in': ids
+            })
+            if match == 'any':
+                queryset = queryset.filter(Exists(rows.filter(**{
+                    source: OuterRef('pk')
+                })))
+            else:
+                queryset = queryset.filter(id__in=rows.values(
+                    source
+                ).annotate(matched=Count(target)).filter(
+                    matched=len(ids)
+                ).values(source))
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        """list recipes, answering conditional requests from one query"""
+        state = self.queryset.filter(user=request.user).aggregate(
+            count=Count('id'), updated_at=Max('updated_at')
+        )
+        raw = '{}:{}:{}:{}'.format(
+            request.user.id,
+            state['count'],
+            state['updated_at'],
+            request.build_absolute_uri()
+        )
+        etag = '"{}"'.format(hashlib.md5(raw.encode()).hexdigest())
+        # no Last-Modified: deleting a recipe does not move the newest
+        # updated_at, only the count in the ETag sees it
+        return self.conditional_response(
+            request, etag, None, super().list, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        """return a recipe, or 304 if the client copy is current"""
+        try:
+            updated_at = self.queryset.filter(
+                user=request.user, pk=kwargs['pk']
+            ).values_list('updated_at', flat=True).first()
+        except ValueError:
+            updated_at = None
+        if updated_at is None:
+            return super().retrieve(request, *args, **kwargs)
+        etag = '"{}-{}"'.format(kwargs['pk'], updated_at.timestamp())
+        return self.conditional_response(
+            request, etag, updated_at, super().retrieve, *args, **kwargs
+        )
+
+    def conditional_response(self, request, etag, updated_at, view,
+                             *args, **kwargs):
+        """return 304 if the validators match, otherwise call view"""
+        last_modified = int(updated_at.timestamp()) if updated_at else None
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = view(request, *args, **kwargs)
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ('Authorization', ))
+        return response
 
     def get_serializer_class(self):
         """return appropriate serializer class"""
         if self.action == 'retrieve':
             return serializers.RecipeDetailSerializer
+        elif self.action in ('upload_image', 'resumable_upload'):
+            return serializers.RecipeImageSerializer
         return self.serializer_class
 
     def perform_create(self, serializer):
         """create a new recipe"""
         serializer.save(user=self.request.user)
+
+    @action(detail=True, methods=['post'], url_path='upload-image')
+    def upload_image(self, request, pk=None):
+        """upload an image, resized variants are generated in the background"""
+        recipe = self.get_object()
+        previous = recipe.image.name
+        serializer = self.get_serializer(recipe, data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            serializer.save()
+        schedule_variants(recipe.image.name)
+        if previous != recipe.image.name:
+            release_image(previous)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['get', 'put'],
+            url_path='upload-image/resumable', url_name='resumable-upload')
+    def resumable_upload(self, request, pk=None):
+        """upload an image in chunks sent with a Content-Range header
+
+        GET returns the offset to resume from after an interruption.
+        """
+        recipe = self.get_object()
+        if request.method == 'GET':
+            return Response({'offset': uploads.upload_offset(recipe)})
+        start, end, total = uploads.parse_content_range(
+            request.META.get('HTTP_CONTENT_RANGE')
+        )
+        try:
+            offset = uploads.write_chunk(
+                recipe, request.stream or io.BytesIO(), start, end, total
+            )
+        except uploads.UploadOffsetMismatch as exc:
+            return Response(
+                {'detail': exc.detail, 'offset': exc.offset},
+                status=exc.status_code
+            )
+        if offset < total:
+            return Response(
+                {'offset': offset}, status=status.HTTP_202_ACCEPTED
+            )
+        uploads.finish_upload(recipe)
+        schedule_variants(recipe.image.name)
+        serializer = self.get_serializer(recipe)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """stream every recipe of the user as JSON or NDJSON"""
+        output = request.query_params.get('output', 'json')
+        if output not in self.export_formats:
+            return Response(
+                {'output': ['must be one of json, ndjson']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        stream, content_type = self.export_formats[output]
+        response = StreamingHttpResponse(
+            stream(self.get_queryset()),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = \
+            f'attachment; filename="recipes.{output}"'
+        return response
+
+
+class SyncView(APIView):
+    """return the recipes, tags and ingredients changed since a watermark"""
+    authentication_classes = (CachedTokenAuthentication, )
+    permission_classes = (IsAuthenticated, )
+    sync_models = (
+        ('recipes', Recipe, serializers.RecipeSerializer),
+        ('tags', Tag, serializers.TagSerializer),
+        ('ingredients', Ingredient, serializers.IngredientSerializer),
+    )
+
+    def get(self, request):
+        """return changes after ?since=, at most ?limit= log entries"""
+        since = self._integer('since', 0)
+        limit = self._integer(
+            'limit', getattr(settings, 'API_PAGE_SIZE', 100)
+        )
+        limit = max(1, min(limit, getattr(settings, 'API_MAX_PAGE_SIZE', 500)))
+        changes = list(ChangeLog.objects.filter(
+            user=request.user, id__gt=since
+        ).order_by('id').values_list(
+            'id', 'model', 'object_id', 'action'
+        )[:limit + 1])
+        data = {
+            'watermark': changes[:limit][-1][0] if changes else since,
+            'has_more': len(changes) > limit,
+        }
+        latest = {}
+        for _, name, object_id, change in changes[:limit]:
+            latest[(name, object_id)] = change
+        for key, model, serializer_class in self.sync_models:
+            name = model._meta.model_name
+            upserted = [object_id for (changed, object_id), change
+                        in latest.items()
+                        if changed == name and change == ChangeLog.UPSERT]
+            deleted = [object_id for (changed, object_id), change
+                       in latest.items()
+                       if changed == name and change == ChangeLog.DELETE]
+            queryset = model.objects.filter(
+                user=request.user, id__in=upserted
+            ).order_by('id')
+            if model is Recipe:
+                queryset = queryset.prefetch_related(
+                    Prefetch('ingredients', Ingredient.objects.only('id')),
+                    Prefetch('tags', Tag.objects.only('id')),
+                )
+            data[key] = {
+                'updated': serializer_class(
+                    queryset, many=True, context={'request': request}
+                ).data,
+                'deleted': sorted(deleted),
+            }
+        return Response(data)
+
+    def _integer(self, name, default):
+        """return an integer query parameter"""
+        try:
+            return int(self.request.query_params.get(name, default))
+        except ValueError:
+            raise ValidationError({name: ['Expected an integer.']})
+
+
+class MediaView(APIView):
+    """serve recipe images to the users whose recipes use them"""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def perform_content_negotiation(self, request, force=False):
+        # files are sent as they are, whatever the client accepts
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, path):
+        if not image_owned(request.user, path):
+            raise Http404
+        return serve_media(request, path)
@@ -0,0 +1,84 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import check_password, get_hasher, \
+    identify_hasher, make_password
+
+
+_executor = None
+_slots = None
+_lock = threading.Lock()
+
+
+class PasswordHashOverloaded(Exception):
+    """no password hashing slot freed up within PASSWORD_HASH_TIMEOUT"""
+
+
+def get_pool():
+    """return the hashing thread pool and its semaphore of queue slots"""
+    global _executor, _slots
+    with _lock:
+        if _executor is None:
+            workers = settings.PASSWORD_HASH_WORKERS
+            _executor = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix='password-hash'
+            )
+            _slots = threading.BoundedSemaphore(
+                workers + settings.PASSWORD_HASH_QUEUE
+            )
+        return _executor, _slots
+
+
+def run_hashing(func, *args):
+    """run func in the hashing pool and return its result"""
+    executor, slots = get_pool()
+    if not slots.acquire(timeout=settings.PASSWORD_HASH_TIMEOUT):
+        raise PasswordHashOverloaded
+    try:
+        return executor.submit(func, *args).result()
+    finally:
+        slots.release()
+
+
+def verify_password(password, encoded):
+    """check password, return (valid, new hash if encoded is outdated)"""
+    if not check_password(password, encoded):
+        return False, None
+    hasher = identify_hasher(encoded)
+    if hasher.algorithm != get_hasher().algorithm or \
+            hasher.must_update(encoded):
+        return True, make_password(password)
+    return True, None
+
+
+class PooledModelBackend(ModelBackend):
+    """model backend hashing passwords in a bounded thread pool
+
+    Users are loaded and saved on the request thread, only the hashing
+    runs in the pool. Passwords stored with an outdated hasher are rehashed
+    with the preferred one on a successful login.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # hash anyway so unknown emails take as long as known ones
+            run_hashing(make_password, password)
+            return None
+
+        valid, encoded = run_hashing(verify_password, password, user.password)
+        if not valid or not self.user_can_authenticate(user):
+            return None
+        if encoded:
+            user.password = encoded
+            user.save(update_fields=['password'])
+        return user
@@ -1,6 +1,7 @@
 from django.contrib.auth import get_user_model, authenticate
-from rest_framework import serializers
+from rest_framework import exceptions, serializers
 from django.utils.translation import ugettext_lazy as _
+from user.backends import PasswordHashOverloaded
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -37,11 +38,14 @@ class AuthTokenSerializer(serializers.Serializer):
         """validate and authenticate user"""
         email = attrs.get('email')
         password = attrs.get('password')
-        user = authenticate(
-            request=self.context.get('request'),
-            username=email,
-            password=password
-        )
+        try:
+            user = authenticate(
+                request=self.context.get('request'),
+                username=email,
+                password=password
+            )
+        except PasswordHashOverloaded:
+            raise exceptions.Throttled(wait=1)
         if not user:
             msg = _('unable to authenticate with provided credentials')
             raise serializers.ValidationError(msg, code='authentication')
@@ -0,0 +1,92 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from user import backends
+from user.throttling import reset_login_limits
+
+
+TOKEN_URL = reverse('user:token')
+
+
+class PooledBackendTests(TestCase):
+    """test logins hashing passwords in the thread pool"""
+
+    def setUp(self):
+        reset_login_limits()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='hash@gmail.com',
+            password='test123'
+        )
+
+    def login(self, password='test123'):
+        return self.client.post(
+            TOKEN_URL, {'email': 'hash@gmail.com', 'password': password}
+        )
+
+    def test_new_passwords_use_argon2(self):
+        """test passwords are stored with the preferred hasher"""
+        self.assertTrue(self.user.password.startswith('argon2$'))
+        res = self.login()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_outdated_hash_upgraded_on_login(self):
+        """test a pbkdf2 hash is replaced by argon2 on login"""
+        self.user.password = make_password('test123', hasher='pbkdf2_sha256')
+        self.user.save()
+
+        res = self.login()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('argon2$'))
+        self.assertTrue(self.user.check_password('test123'))
+
+    def test_outdated_hash_kept_on_failed_login(self):
+        """test a wrong password does not touch the stored hash"""
+        encoded = make_password('test123', hasher='pbkdf2_sha256')
+        self.user.password = encoded
+        self.user.save()
+
+        res = self.login('wrong')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.password, encoded)
+
+    def test_inactive_user_rejected(self):
+        """test inactive users cannot log in"""
+        self.user.is_active = False
+        self.user.save()
+        res = self.login()
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @patch('user.backends.run_hashing', wraps=backends.run_hashing)
+    def test_unknown_email_still_hashes(self, run_hashing):
+        """test unknown emails spend the same hashing work"""
+        res = self.client.post(
+            TOKEN_URL, {'email': 'nobody@gmail.com', 'password': 'test123'}
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        run_hashing.assert_called_once()
+
+    @override_settings(PASSWORD_HASH_TIMEOUT=0)
+    def test_overloaded_pool_throttles(self):
+        """test logins are refused when no hashing slot is free"""
+        _, slots = backends.get_pool()
+        acquired = 0
+        while slots.acquire(blocking=False):
+            acquired += 1
+        try:
+            res = self.login()
+        finally:
+            for _ in range(acquired):
+                slots.release()
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
@@ -0,0 +1,154 @@
+import base64
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from user.throttling import (
+    LoginRateThrottle, RateLimiter, ip_limiter, reset_login_limits
+)
+
+
+TOKEN_URL = reverse('user:token')
+
+
+class LoginThrottleTests(TestCase):
+    """test login attempts are limited before passwords are hashed"""
+
+    def setUp(self):
+        reset_login_limits()
+        self.client = APIClient()
+        get_user_model().objects.create_user(
+            email='limit@gmail.com',
+            password='test123'
+        )
+
+    def login(self, password, email='limit@gmail.com'):
+        return self.client.post(
+            TOKEN_URL, {'email': email, 'password': password}
+        )
+
+    def test_failed_logins_limited_per_email(self):
+        """test an email is locked out after repeated failures"""
+        for _ in range(5):
+            res = self.login('wrong')
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        with patch('user.serializers.authenticate') as authenticate:
+            res = self.login('test123', email=' LIMIT@gmail.com')
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', res)
+        authenticate.assert_not_called()
+
+        res = self.login('wrong', email='other@gmail.com')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_successful_logins_not_limited_per_email(self):
+        """test successful logins do not count against the email"""
+        for _ in range(6):
+            res = self.login('test123')
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_basic_auth_not_checked(self):
+        """test a basic auth header does not hash passwords"""
+        credentials = base64.b64encode(b'limit@gmail.com:wrong').decode()
+        with patch('rest_framework.authentication.authenticate') as basic:
+            for _ in range(6):
+                res = self.client.post(
+                    TOKEN_URL,
+                    {'email': 'limit@gmail.com', 'password': 'wrong'},
+                    HTTP_AUTHORIZATION=f'Basic {credentials}'
+                )
+            self.client.post(
+                reverse('user:create'),
+                {'email': 'new@gmail.com', 'password': 'test123'},
+                HTTP_AUTHORIZATION=f'Basic {credentials}'
+            )
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        basic.assert_not_called()
+
+    @patch.object(ip_limiter, 'num', 3)
+    def test_attempts_limited_per_ip(self):
+        """test one client cannot try many emails"""
+        for i in range(3):
+            res = self.login('wrong', email=f'user{i}@gmail.com')
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.login('test123')
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @patch.object(ip_limiter, 'num', 3)
+    def test_spoofed_forwarded_for_ignored(self):
+        """test a client cannot dodge the ip limit with X-Forwarded-For"""
+        for i in range(3):
+            res = self.client.post(
+                TOKEN_URL,
+                {'email': f'user{i}@gmail.com', 'password': 'wrong'},
+                HTTP_X_FORWARDED_FOR=f'10.0.0.{i}'
+            )
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.post(
+            TOKEN_URL,
+            {'email': 'limit@gmail.com', 'password': 'test123'},
+            HTTP_X_FORWARDED_FOR='10.0.0.99'
+        )
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_parallel_attempts_limited_per_email(self):
+        """test attempts still in flight count against the email"""
+        factory = APIRequestFactory()
+        throttle = LoginRateThrottle()
+        allowed = []
+        for i in range(6):
+            request = Request(
+                factory.post(
+                    TOKEN_URL,
+                    {'email': 'limit@gmail.com', 'password': 'wrong'},
+                    format='json',
+                    REMOTE_ADDR=f'10.0.0.{i}'
+                ),
+                parsers=[JSONParser()]
+            )
+            allowed.append(throttle.allow_request(request, None))
+        self.assertEqual(allowed, [True] * 5 + [False])
+
+
+class RateLimiterTests(TestCase):
+    """test the token bucket limiter"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_bucket_refills(self):
+        """test attempts are allowed again once the bucket refills"""
+        limiter = RateLimiter('2/min', 'test:')
+        with patch('user.throttling.time.monotonic', return_value=100):
+            limiter.hit('key')
+            limiter.hit('key')
+            self.assertEqual(limiter.wait('key'), 30)
+        with patch('user.throttling.time.monotonic', return_value=130):
+            self.assertEqual(limiter.wait('key'), 0)
+
+    def test_refund(self):
+        """test a refunded attempt is available again"""
+        limiter = RateLimiter('1/min', 'test:', shared_cache='default')
+        limiter.hit('key')
+        self.assertGreater(limiter.wait('key'), 0)
+        limiter.refund('key')
+        self.assertEqual(limiter.wait('key'), 0)
+
+    @patch('user.throttling.time.time', return_value=6000)
+    def test_shared_window_across_processes(self, _):
+        """test the shared cache enforces the rate without local state"""
+        limiter = RateLimiter('2/min', 'test:', shared_cache='default')
+        limiter.hit('key')
+        limiter.hit('key')
+        limiter.clear()
+        self.assertGreater(limiter.wait('key'), 0)
+        self.assertEqual(limiter.wait('other'), 0)
@@ -4,6 +4,8 @@ from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from user.throttling import reset_login_limits
+
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse('user:token')
 ME_URL = reverse('user:me')
@@ -17,6 +19,7 @@ class PublicApiTests(TestCase):
     """tests the user API public"""
 
     def setUp(self):
+        reset_login_limits()
         self.client = APIClient()
 
     def test_valid_user_success(self):
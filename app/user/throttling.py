@@ -0,0 +1,176 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """return (requests, seconds) from a rate such as 5/min"""
+    num, period = rate.split('/')
+    return int(num), DURATIONS[period[0]]
+
+
+class RateLimiter:
+    """token bucket per key, with an optional shared sliding window
+
+    The local buckets reject most abusive traffic without any network
+    round trip. The shared cache, when configured, enforces the same rate
+    across every worker process.
+    """
+
+    def __init__(self, rate, key_prefix, max_keys=10000, shared_cache=None):
+        self.num, self.duration = parse_rate(rate)
+        self.key_prefix = key_prefix
+        self.max_keys = max_keys
+        self.shared_cache = shared_cache
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _shared(self):
+        """return the shared cache backend, if one is configured"""
+        if self.shared_cache:
+            return caches[self.shared_cache]
+        return None
+
+    def _tokens(self, key, now):
+        """return the tokens left in the bucket of key, refilled to now"""
+        tokens, updated = self._buckets.get(key, (self.num, now))
+        tokens = min(self.num, tokens + (now - updated) * self.num /
+                     self.duration)
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return tokens
+
+    def _windows(self, key, now):
+        """return the current and previous shared window keys and the
+        fraction of the current window elapsed"""
+        window = int(now // self.duration)
+        prefix = f'{self.key_prefix}{key}:'
+        return (f'{prefix}{window}', f'{prefix}{window - 1}',
+                now % self.duration / self.duration)
+
+    def wait(self, key):
+        """return the seconds until key may try again, 0 if it may now"""
+        with self._lock:
+            tokens = self._tokens(key, time.monotonic())
+        if tokens < 1:
+            return (1 - tokens) * self.duration / self.num
+        shared = self._shared()
+        if shared:
+            current, previous, elapsed = self._windows(key, time.time())
+            counts = shared.get_many([current, previous])
+            count = counts.get(previous, 0) * (1 - elapsed) + \
+                counts.get(current, 0)
+            if count >= self.num:
+                return (1 - elapsed) * self.duration
+        return 0
+
+    def hit(self, key):
+        """use up one attempt of key"""
+        now = time.monotonic()
+        with self._lock:
+            self._buckets[key] = (self._tokens(key, now) - 1, now)
+        shared = self._shared()
+        if shared:
+            current, _, _ = self._windows(key, time.time())
+            if not shared.add(current, 1, self.duration * 2):
+                try:
+                    shared.incr(current)
+                except ValueError:
+                    shared.set(current, 1, self.duration * 2)
+
+    def refund(self, key):
+        """give back one attempt of key taken by hit"""
+        now = time.monotonic()
+        with self._lock:
+            tokens = min(self.num, self._tokens(key, now) + 1)
+            self._buckets[key] = (tokens, now)
+        shared = self._shared()
+        if shared:
+            current, _, _ = self._windows(key, time.time())
+            try:
+                if shared.decr(current) < 0:
+                    shared.set(current, 0, self.duration * 2)
+            except ValueError:
+                pass
+
+    def clear(self):
+        """forget every local bucket"""
+        with self._lock:
+            self._buckets.clear()
+
+
+def limiters_from_settings():
+    """build the ip and email limiters from the LOGIN_THROTTLE setting"""
+    options = getattr(settings, 'LOGIN_THROTTLE', {})
+    kwargs = {
+        'max_keys': options.get('MAX_KEYS', 10000),
+        'shared_cache': options.get('SHARED_CACHE'),
+    }
+    return (
+        RateLimiter(options.get('IP_RATE', '20/min'), 'login-ip:', **kwargs),
+        RateLimiter(
+            options.get('EMAIL_RATE', '5/min'), 'login-email:', **kwargs
+        ),
+    )
+
+
+ip_limiter, email_limiter = limiters_from_settings()
+
+
+def reset_login_limits():
+    """forget every local login attempt, used between tests"""
+    ip_limiter.clear()
+    email_limiter.clear()
+
+
+class LoginRateThrottle(BaseThrottle):
+    """refuse login attempts over the per ip or per email rate
+
+    Runs before the credentials are checked, so rejected attempts never
+    reach password hashing. Every attempt counts against the client ip.
+    An attempt also reserves a token of its email up front, so a burst of
+    parallel guesses cannot all pass before any of them fails; successful
+    logins give the token back, see record_success.
+    """
+
+    def allow_request(self, request, view):
+        email = self.get_email(request)
+        ip = self.get_ident(request)
+        self._wait = max(
+            ip_limiter.wait(ip),
+            email_limiter.wait(email) if email else 0,
+        )
+        if self._wait:
+            return False
+        ip_limiter.hit(ip)
+        if email:
+            email_limiter.hit(email)
+        return True
+
+    def wait(self):
+        return self._wait
+
+    @staticmethod
+    def get_email(request):
+        """return the normalized email a login attempt is for"""
+        data = request.data
+        email = data.get('email') if hasattr(data, 'get') else None
+        if not isinstance(email, str):
+            return None
+        return email.strip().lower() or None
+
+    @classmethod
+    def record_success(cls, request):
+        """refund the email token reserved by a successful login"""
+        email = cls.get_email(request)
+        if email:
+            email_limiter.refund(email)
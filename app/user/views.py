@@ -1,24 +1,38 @@
 from user.serializers import UserSerializer, AuthTokenSerializer
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
+from core.authentication import CachedTokenAuthentication
+from user.throttling import LoginRateThrottle
 
 
 class CreateUserView(generics.CreateAPIView):
     """Create a new user in the system"""
     serializer_class = UserSerializer
+    # no credentials are needed, don't let basic auth hash a password
+    authentication_classes = ()
 
 
 class CreateTokenView(ObtainAuthToken):
     """create a new token for the user"""
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    # authentication runs before the throttles, basic auth would check
+    # the password of every locked out attempt
+    authentication_classes = ()
+    throttle_classes = (LoginRateThrottle,)
+
+    def post(self, request, *args, **kwargs):
+        """create a token, only failed attempts count against the email"""
+        response = super().post(request, *args, **kwargs)
+        LoginRateThrottle.record_success(request)
+        return response
 
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """manage the authenticated user"""
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):